@@ -1,5 +1,7 @@
 from .basic_translator_node import TranslatorNode
 from .llm_translator_node import LLMTranslatorNode
+from .llm_batch_translator_node import LLMBatchTranslatorNode
+from .llm_router_node import LLMRouterNode
 from .llm_model_loader_node import LLMLocalModelLoaderNode
 from .general_llm_service_connector_node import GeneralLLMServiceConnectorNode
 from .ollama_llm_connector_node import OllamaLLMConnectorNode
@@ -10,6 +12,15 @@ from .deepseek_connector_node import DeepSeekServiceConnectorNode
 from .kimi_connector_node import KimiServiceConnectorNode
 from .gemini_connector_node import GeminiServiceConnectorNode
 from .chatgpt_connector_node import ChatGPTServiceConnectorNode
+from .metrics import register_routes
+
+# 在 ComfyUI 服务上注册 /owlv_translator/metrics 路由；脱离 ComfyUI 导入（如基准脚本）时没有 PromptServer
+try:
+    from server import PromptServer
+except ImportError:
+    PromptServer = None
+if getattr(PromptServer, "instance", None) is not None:
+    register_routes(PromptServer.instance)
 
 def brand(name: str) -> str:
     return f"{name} 🦉| OwlV"
@@ -17,6 +28,8 @@ def brand(name: str) -> str:
 NODE_CLASS_MAPPINGS = {
     "TranslatorNode": TranslatorNode,
     "LLMTranslatorNode": LLMTranslatorNode,
+    "LLMBatchTranslatorNode": LLMBatchTranslatorNode,
+    "LLMRouterNode": LLMRouterNode,
     "LLMLocalModelLoaderNode": LLMLocalModelLoaderNode,
     "GeneralLLMServiceConnectorNode": GeneralLLMServiceConnectorNode,
     "OllamaLLMConnectorNode": OllamaLLMConnectorNode,
@@ -32,6 +45,8 @@ NODE_CLASS_MAPPINGS = {
 NODE_DISPLAY_NAME_MAPPINGS = {
     "TranslatorNode": brand("Basic Translator"),
     "LLMTranslatorNode": brand("LLM Translator"),
+    "LLMBatchTranslatorNode": brand("LLM Batch Translator"),
+    "LLMRouterNode": brand("LLM Router"),
     "LLMLocalModelLoaderNode": brand("Load LLM Model"),
     "GeneralLLMServiceConnectorNode": brand("General LLM Service Connector"),
     "OllamaLLMConnectorNode": brand("Ollama LLM Connector"),
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+from .metrics import get_metrics
+
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 64
+
+# release() 的调用结果分类
+OUTCOME_SUCCESS = "success"
+OUTCOME_OVERLOAD = "overload"  # 429 / 5xx / 超时，说明服务端已过载
+OUTCOME_IGNORE = "ignore"      # 与负载无关的结果（如 400/401），不参与调节
+
+
+class AIMDController:
+    """加性增、乘性减 (AIMD) 的自适应并发控制器。
+
+    延迟的指数滑动平均 (EWMA) 与基线相比保持平稳时逐步提高并发上限，
+    出现 429/5xx/超时时按 decrease 系数成倍降低。
+    """
+
+    def __init__(self, name: str = "", initial_limit: float = DEFAULT_INITIAL_LIMIT,
+                 min_limit: int = DEFAULT_MIN_LIMIT, max_limit: int = DEFAULT_MAX_LIMIT,
+                 decrease: float = 0.5, latency_tolerance: float = 1.5, alpha: float = 0.2):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.alpha = alpha
+        self.in_flight = 0
+        self.latency_ewma = None
+        self.baseline = None
+        self._condition = threading.Condition()
+        # 异步等待者 (事件循环, future)，release 时在各自的事件循环中唤醒
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(self.min_limit, int(self.limit))
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if not self._has_capacity():
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self):
+        """阻塞直到有空闲的并发名额"""
+        with self._condition:
+            self._condition.wait_for(self._has_capacity)
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """acquire 的异步版本：没有名额时挂起在 future 上，由 release 唤醒后重新检查"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._has_capacity():
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._condition:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    def release(self, latency: float, outcome: str = OUTCOME_SUCCESS):
+        """归还名额并根据本次延迟与结果调整并发上限"""
+        with self._condition:
+            # 只有上限被实际用满一半以上时才继续加，避免空闲时上限无意义地膨胀
+            saturated = self.in_flight * 2 >= int(self.limit)
+            self.in_flight = max(0, self.in_flight - 1)
+            previous = int(self.limit)
+            if outcome == OUTCOME_OVERLOAD:
+                self.limit = max(float(self.min_limit), self.limit * self.decrease)
+            elif outcome == OUTCOME_SUCCESS:
+                self._observe_latency(latency)
+                if saturated and self.latency_ewma <= self.baseline * self.latency_tolerance:
+                    # 每个"窗口"（约 limit 次成功请求）上限加一
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+            if int(self.limit) != previous:
+                get_metrics().set("concurrency_limit", {"backend": self.name}, int(self.limit))
+            self._condition.notify_all()
+            waiters = list(self._waiters)
+            self._waiters.clear()
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # 事件循环已关闭，等待者不会再被调度
+                pass
+
+    def _observe_latency(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = self.baseline = latency
+            return
+        self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+        # 基线跟随最低延迟，并缓慢上浮以适应服务端的长期变化
+        if self.latency_ewma < self.baseline:
+            self.baseline = self.latency_ewma
+        else:
+            self.baseline += 0.01 * (self.latency_ewma - self.baseline)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency_ewma": self.latency_ewma,
+                "baseline": self.baseline,
+            }
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_controllers: Dict[str, AIMDController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(state_key: str) -> AIMDController:
+    """返回与连接器 get_state() 对应的控制器"""
+    with _controllers_lock:
+        controller = _controllers.get(state_key)
+        if controller is None:
+            controller = AIMDController(name=state_key)
+            _controllers[state_key] = controller
+            get_metrics().set("concurrency_limit", {"backend": state_key}, int(controller.limit))
+        return controller
+
+
+def controller_snapshots() -> Dict[str, Dict[str, Any]]:
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {key: controller.snapshot() for key, controller in controllers.items()}
@@ -1,9 +1,37 @@
-from googletrans import Translator
-import requests
-import hashlib
-import time
 import traceback
 
+from .concurrent_executor import DEFAULT_MAX_WORKERS, MAX_WORKERS_LIMIT, list_input, scalar_input
+from .google_translator import GOOGLE_SERVICE, get_google_translator_pool
+from .offline_mt import DEFAULT_BEAM_SIZE, offline_translate_many
+from .segment_packer import get_batch_translator
+from .translation_cache import cache_enabled, cache_lookup, cache_store, make_cache_key
+
+# 语言映射字典 - 支持多个翻译服务的语言代码
+LANGUAGE_MAP = {
+    "英语": {"google": "en", "baidu": "en", "youdao": "en", "tencent": "en", "offline": "en"},
+    "中文": {"google": "zh-cn", "baidu": "zh", "youdao": "zh-CHS", "tencent": "zh", "offline": "zh"},
+    "日语": {"google": "ja", "baidu": "jp", "youdao": "ja", "tencent": "ja", "offline": "ja"},
+    "韩语": {"google": "ko", "baidu": "kor", "youdao": "ko", "tencent": "ko", "offline": "ko"},
+    "法语": {"google": "fr", "baidu": "fra", "youdao": "fr", "tencent": "fr", "offline": "fr"},
+    "德语": {"google": "de", "baidu": "de", "youdao": "de", "tencent": "de", "offline": "de"},
+    "西班牙语": {"google": "es", "baidu": "spa", "youdao": "es", "tencent": "es", "offline": "es"},
+    "意大利语": {"google": "it", "baidu": "it", "youdao": "it", "tencent": "it", "offline": "it"},
+    "俄语": {"google": "ru", "baidu": "ru", "youdao": "ru", "tencent": "ru", "offline": "ru"},
+    "葡萄牙语": {"google": "pt", "baidu": "pt", "youdao": "pt", "tencent": "pt", "offline": "pt"}
+}
+
+LANGUAGES = list(LANGUAGE_MAP)
+AUTO_LANGUAGE = "自动"
+
+OFFLINE_SERVICE = "离线翻译"
+# 这些服务支持一次请求翻译多段文本，列表输入按请求大小上限打包发送
+# 服务名: (LANGUAGE_MAP中的列, ID参数, 密钥参数, 缺少凭据时的提示)
+BATCH_SERVICES = {
+    "百度翻译": ("baidu", "baidu_app_id", "baidu_secret_key", "百度翻译需要填写App ID和密钥，请在可选参数中配置"),
+    "有道翻译": ("youdao", "youdao_app_id", "youdao_secret_key", "有道翻译需要填写App ID和密钥，请在可选参数中配置"),
+    "腾讯翻译": ("tencent", "tencent_secret_id", "tencent_secret_key", "腾讯翻译需要填写Secret ID和密钥，请在可选参数中配置"),
+}
+
 class TranslatorNode:
     @classmethod
     def INPUT_TYPES(cls):
@@ -13,10 +41,10 @@ class TranslatorNode:
                     "multiline": True,
                     "default": ""
                 }),
-                "target_language": (["英语", "中文", "日语", "韩语", "法语", "德语", "西班牙语", "意大利语", "俄语", "葡萄牙语"], {
+                "target_language": (LANGUAGES, {
                     "default": "英语"
                 }),
-                "translator_service": (["Google翻译", "百度翻译", "有道翻译", "腾讯翻译"], {
+                "translator_service": (["Google翻译", "百度翻译", "有道翻译", "腾讯翻译", OFFLINE_SERVICE], {
                     "default": "Google翻译"
                 }),
             },
@@ -27,138 +55,111 @@ class TranslatorNode:
                 "youdao_secret_key": ("STRING", {"default": ""}),
                 "tencent_secret_id": ("STRING", {"default": ""}),
                 "tencent_secret_key": ("STRING", {"default": ""}),
+                "use_cache": ("BOOLEAN", {"default": True}),
+                "max_workers": ("INT", {"default": DEFAULT_MAX_WORKERS, "min": 1, "max": MAX_WORKERS_LIMIT}),
+                # 仅离线翻译使用；源语言为"自动"时按文字体系与常用词判断
+                "beam_size": ("INT", {"default": DEFAULT_BEAM_SIZE, "min": 1, "max": 8}),
+                "source_language": ([AUTO_LANGUAGE] + LANGUAGES, {"default": AUTO_LANGUAGE}),
+                # 百度/有道/腾讯每秒请求数上限，0 表示使用服务默认值（百度标准版为1，腾讯为5）
+                "qps": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 100.0, "step": 0.5}),
             }
         }
     
+    # 列表输入在节点内部并发翻译，而不是由 ComfyUI 逐条串行调用
+    INPUT_IS_LIST = True
     RETURN_TYPES = ("STRING",)
     RETURN_NAMES = ("translated_text",)
+    OUTPUT_IS_LIST = (True,)
     FUNCTION = "translate"
     CATEGORY = "Text Processing"
-    
-    def translate(self, text, target_language, translator_service, 
-                  baidu_app_id="", baidu_secret_key="", 
-                  youdao_app_id="", youdao_secret_key="", 
-                  tencent_secret_id="", tencent_secret_key=""):
-        # 语言映射字典 - 支持多个翻译服务的语言代码
-        language_map = {
-            "英语": {"google": "en", "baidu": "en", "youdao": "en", "tencent": "en"},
-            "中文": {"google": "zh-cn", "baidu": "zh", "youdao": "zh-CHS", "tencent": "zh"},
-            "日语": {"google": "ja", "baidu": "jp", "youdao": "ja", "tencent": "ja"},
-            "韩语": {"google": "ko", "baidu": "kor", "youdao": "ko", "tencent": "ko"},
-            "法语": {"google": "fr", "baidu": "fra", "youdao": "fr", "tencent": "fr"},
-            "德语": {"google": "de", "baidu": "de", "youdao": "de", "tencent": "de"},
-            "西班牙语": {"google": "es", "baidu": "spa", "youdao": "es", "tencent": "es"},
-            "意大利语": {"google": "it", "baidu": "it", "youdao": "it", "tencent": "it"},
-            "俄语": {"google": "ru", "baidu": "ru", "youdao": "ru", "tencent": "ru"},
-            "葡萄牙语": {"google": "pt", "baidu": "pt", "youdao": "pt", "tencent": "pt"}
+
+    def translate(self, text, target_language, translator_service,
+                  baidu_app_id=None, baidu_secret_key=None,
+                  youdao_app_id=None, youdao_secret_key=None,
+                  tencent_secret_id=None, tencent_secret_key=None,
+                  use_cache=None, max_workers=None, beam_size=None, qps=None, source_language=None):
+        options = {
+            "target_language": scalar_input(target_language, "英语"),
+            "translator_service": scalar_input(translator_service, "Google翻译"),
+            "baidu_app_id": scalar_input(baidu_app_id, ""),
+            "baidu_secret_key": scalar_input(baidu_secret_key, ""),
+            "youdao_app_id": scalar_input(youdao_app_id, ""),
+            "youdao_secret_key": scalar_input(youdao_secret_key, ""),
+            "tencent_secret_id": scalar_input(tencent_secret_id, ""),
+            "tencent_secret_key": scalar_input(tencent_secret_key, ""),
+            "use_cache": scalar_input(use_cache, True),
         }
-        
-        if not text or not text.strip():
-            return ("",)
-        
+        texts = list_input(text)
+        service = options["translator_service"]
+        target_language = options["target_language"]
+        if service == OFFLINE_SERVICE:
+            # 离线模型整批做束搜索，比逐条调用快得多
+            target = LANGUAGE_MAP.get(target_language, {}).get("offline", "en")
+            beam = scalar_input(beam_size, DEFAULT_BEAM_SIZE)
+            source_name = scalar_input(source_language, AUTO_LANGUAGE)
+            source = LANGUAGE_MAP.get(source_name, {}).get("offline")
+            return (self._batch_translate(
+                texts, target_language, service, options["use_cache"],
+                lambda pending: offline_translate_many(pending, target, beam_size=beam, source=source),
+                model=f"source={source}" if source else ""),)
+        if service == GOOGLE_SERVICE:
+            # 分批提交给复用的 Translator 实例，单条失败只影响该条
+            target = LANGUAGE_MAP.get(target_language, {}).get("google", "en")
+            workers = scalar_input(max_workers, DEFAULT_MAX_WORKERS)
+            return (self._batch_translate(
+                texts, target_language, service, options["use_cache"],
+                lambda pending: self._google_translate_many(pending, target, workers)),)
+        if service in BATCH_SERVICES:
+            # 多段文本打包进尽量少的请求，并按账号的QPS限流
+            column, id_param, key_param, hint = BATCH_SERVICES[service]
+            app_id, secret_key = options[id_param], options[key_param]
+            if not app_id or not secret_key:
+                return ([hint if item and item.strip() else "" for item in texts],)
+            target = LANGUAGE_MAP.get(target_language, {}).get(column, "en")
+            translator = get_batch_translator(service, app_id, secret_key, scalar_input(qps, 0.0))
+            workers = scalar_input(max_workers, DEFAULT_MAX_WORKERS)
+            return (self._batch_translate(
+                texts, target_language, service, options["use_cache"],
+                lambda pending: translator.translate_many(pending, target, workers)),)
+        return (["不支持的翻译服务" if item and item.strip() else "" for item in texts],)
+
+    def _batch_translate(self, texts, target_language, translator_service, use_cache, translate_many, model=""):
+        """批量翻译：先查缓存，未命中的条目一次性交给 translate_many(文本列表) 翻译；
+        model 区分影响译文的其它设置（如离线翻译指定的源语言）"""
+        results = ["" for _ in texts]
+        caching = use_cache and cache_enabled()
+        keys = {}
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+            if caching:
+                keys[i] = make_cache_key(translator_service, model, target_language, "", text)
+                cached = cache_lookup(keys[i], translator_service)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            pending.append(i)
+        if not pending:
+            return results
+
         try:
-            # 获取目标语言代码
-            target_lang = language_map.get(target_language, {
-                "google": "en", "baidu": "en", "youdao": "en", "tencent": "en"
-            })
-            
-            # 根据选择的翻译服务调用对应的方法
-            if translator_service == "Google翻译":
-                return self._google_translate(text, target_lang["google"])
-            elif translator_service == "百度翻译":
-                if not baidu_app_id or not baidu_secret_key:
-                    return ("百度翻译需要填写App ID和密钥，请在可选参数中配置",)
-                return self._baidu_translate(text, target_lang["baidu"], baidu_app_id, baidu_secret_key)
-            elif translator_service == "有道翻译":
-                if not youdao_app_id or not youdao_secret_key:
-                    return ("有道翻译需要填写App ID和密钥，请在可选参数中配置",)
-                return self._youdao_translate(text, target_lang["youdao"], youdao_app_id, youdao_secret_key)
-            elif translator_service == "腾讯翻译":
-                if not tencent_secret_id or not tencent_secret_key:
-                    return ("腾讯翻译需要填写Secret ID和密钥，请在可选参数中配置",)
-                return self._tencent_translate(text, target_lang["tencent"], tencent_secret_id, tencent_secret_key)
-            else:
-                return ("不支持的翻译服务",)
-                
+            translated = translate_many([texts[i] for i in pending])
         except Exception as e:
             error_msg = f"翻译失败: {str(e)}"
             print(f"翻译节点错误: {error_msg}")
             print(f"错误详情: {traceback.format_exc()}")
-            return (error_msg,)
-    
-    def _google_translate(self, text, target_lang):
-        """Google翻译 - 适用于国际网络环境"""
-        translator = Translator()
-        result = translator.translate(text, dest=target_lang)
-        return (result.text,)
-    
-    def _baidu_translate(self, text, target_lang, app_id, secret_key):
-        """百度翻译 - 适用于中国大陆网络环境"""
-        # 生成签名
-        salt = str(int(time.time() * 1000))
-        sign_str = app_id + text + salt + secret_key
-        sign = hashlib.md5(sign_str.encode('utf-8')).hexdigest()
-        
-        # 构建请求
-        url = "https://fanyi-api.baidu.com/api/trans/vip/translate"
-        params = {
-            'q': text,
-            'from': 'auto',
-            'to': target_lang,
-            'appid': app_id,
-            'salt': salt,
-            'sign': sign
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        result = response.json()
-        
-        if 'trans_result' in result:
-            return (result['trans_result'][0]['dst'],)
-        else:
-            error_code = result.get('error_code', '未知')
-            error_msg = result.get('error_msg', '未知错误')
-            return (f"百度翻译错误 [{error_code}]: {error_msg}",)
-    
-    def _youdao_translate(self, text, target_lang, app_id, secret_key):
-        """有道翻译 - 适用于中国大陆网络环境"""
-        # 生成签名
-        salt = str(int(time.time() * 1000))
-        curtime = str(int(time.time()))
-        sign_str = app_id + self._truncate(text) + salt + curtime + secret_key
-        sign = hashlib.sha256(sign_str.encode('utf-8')).hexdigest()
-        
-        # 构建请求
-        url = "https://openapi.youdao.com/api"
-        data = {
-            'q': text,
-            'from': 'auto',
-            'to': target_lang,
-            'appKey': app_id,
-            'salt': salt,
-            'sign': sign,
-            'signType': 'v3',
-            'curtime': curtime
-        }
-        
-        response = requests.post(url, data=data, timeout=10)
-        result = response.json()
-        
-        if result.get('errorCode') == '0':
-            return (result['translation'][0],)
-        else:
-            error_code = result.get('errorCode', '未知')
-            return (f"有道翻译错误代码: {error_code}",)
-    
-    def _tencent_translate(self, text, target_lang, secret_id, secret_key):
-        """腾讯翻译 - 需要腾讯云SDK，当前为基础框架"""
-        # 注意：完整实现需要腾讯云SDK和复杂的签名算法
-        # 这里提供基础框架，实际使用建议安装 tencentcloud-sdk-python
-        return ("腾讯翻译功能需要安装腾讯云SDK，建议使用百度或有道翻译",)
-    
-    def _truncate(self, q):
-        """有道翻译签名需要的文本截断方法"""
-        if q is None:
-            return None
-        size = len(q)
-        return q if size <= 20 else q[0:10] + str(size) + q[size - 10:size]
+            for i in pending:
+                results[i] = error_msg
+            return results
+
+        for i, item in zip(pending, translated):
+            results[i] = item
+            # 失败条目的错误信息不会被 cache_store 写入；与原文相同的结果可能是未识别源语言而原样返回，也不写入
+            if caching and item != texts[i]:
+                cache_store(keys[i], item)
+        return results
+
+    def _google_translate_many(self, texts, target_lang, max_workers):
+        results, errors = get_google_translator_pool().translate_many(texts, target_lang, max_workers)
+        return [f"翻译失败: {e}" if e is not None else r for r, e in zip(results, errors)]
@@ -0,0 +1,97 @@
+"""基准与压力测试脚本共用的工具：按 ComfyUI 的方式加载插件，并把各连接器指向本地模拟服务端。"""
+import importlib
+import importlib.util
+import os
+import sys
+import tempfile
+from urllib.parse import urlsplit
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_NAME = "owlv_translator"
+
+# 模拟服务端使用的凭据，不是真实密钥
+FAKE_KEY = "sk-benchmark"
+
+
+def load_plugin():
+    """与 ComfyUI 加载 custom_nodes 相同：以包的形式导入插件目录下的 __init__.py"""
+    if PLUGIN_NAME in sys.modules:
+        return sys.modules[PLUGIN_NAME]
+    # 测试产生的统计与缓存不写入插件的 cache 目录
+    os.environ.setdefault("OWLV_TRANSLATOR_CACHE", "0")
+    spec = importlib.util.spec_from_file_location(PLUGIN_NAME, os.path.join(PLUGIN_DIR, "__init__.py"),
+                                                  submodule_search_locations=[PLUGIN_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PLUGIN_NAME] = module
+    spec.loader.exec_module(module)
+    plugin_module("provider_stats").get_stats_store().path = os.path.join(
+        tempfile.mkdtemp(prefix="owlv-bench-"), "provider_stats.json")
+    return module
+
+
+def plugin_module(name):
+    return importlib.import_module(f"{PLUGIN_NAME}.{name}")
+
+
+def disable_rate_limits():
+    """取消各服务商的客户端配额，测量的是本插件的开销而不是配额"""
+    rate_limiter = plugin_module("rate_limiter")
+    for provider in list(rate_limiter.DEFAULT_RATE_LIMITS):
+        rate_limiter.configure_rate_limit(provider, None, None)
+
+
+def redirect(url, base_url):
+    """把 url 的 scheme://host 换成模拟服务端地址，保留路径与查询参数"""
+    parts = urlsplit(url)
+    return base_url.rstrip("/") + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def build_connectors(base_url, model="mock-model"):
+    """创建 llm_connectors 中的全部连接器与 GeminiConnector，并指向模拟服务端"""
+    connectors = plugin_module("llm_connectors")
+    gemini = plugin_module("gemini_connector_node")
+    built = {
+        "General": connectors.GeneralLLMServiceConnector(f"{base_url}/v1/chat/completions", FAKE_KEY, model),
+        "SiliconFlow": connectors.SiliconFlowConnector(FAKE_KEY, model),
+        "ZhiPu": connectors.ZhiPuConnector(FAKE_KEY, model),
+        "Moonshot": connectors.MoonshotConnector(FAKE_KEY, model),
+        "DeepSeek": connectors.DeepSeekConnector(FAKE_KEY, model),
+        "OpenAI": connectors.OpenAIConnector(FAKE_KEY, model),
+        "AzureOpenAI": connectors.AzureOpenAIConnector(FAKE_KEY, model, f"{base_url}/openai/chat/completions"),
+        "Qwen": connectors.QwenConnector(FAKE_KEY, model),
+        "Claude": connectors.ClaudeConnector(FAKE_KEY, model),
+        "Grok": connectors.GrokConnector(FAKE_KEY, model),
+        "Ollama": connectors.OllamaConnector(base_url, model),
+        "Gemini": gemini.GeminiConnector(FAKE_KEY, model),
+    }
+    for connector in built.values():
+        connector.api_url = redirect(connector.api_url, base_url)
+    return built
+
+
+def redirect_translators(base_url):
+    """把 TranslatorNode 使用的百度/有道/腾讯接口指向模拟服务端"""
+    segment_packer = plugin_module("segment_packer")
+    for translator in (segment_packer.BaiduBatchTranslator, segment_packer.YoudaoBatchTranslator,
+                       segment_packer.TencentBatchTranslator):
+        translator.url = redirect(translator.url, base_url)
+
+
+def translator_credentials(service):
+    """TranslatorNode 各服务的凭据参数"""
+    return {
+        "百度翻译": {"baidu_app_id": ["bench"], "baidu_secret_key": [FAKE_KEY]},
+        "有道翻译": {"youdao_app_id": ["bench"], "youdao_secret_key": [FAKE_KEY]},
+        "腾讯翻译": {"tencent_secret_id": ["bench"], "tencent_secret_key": [FAKE_KEY]},
+    }[service]
+
+
+def percentile(values, q):
+    """线性插值百分位数，q 取 0-100"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
@@ -0,0 +1,105 @@
+"""插件导入耗时基准。
+
+按 ComfyUI 加载 custom_nodes 的方式在全新的子进程中导入本插件，测量注册 NODE_CLASS_MAPPINGS 的耗时与内存，
+并检查较重的第三方依赖是否被推迟到首次使用时才导入；再逐个测量这些依赖单独导入的耗时，即启动时省下的开销。
+
+用法：python benchmarks/import_time.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 推迟到首次使用时导入的依赖
+LAZY_MODULES = ["requests", "googletrans", "httpx", "aiohttp", "llama_cpp", "ctranslate2", "transformers"]
+
+# ComfyUI 启动时已经导入的模块，预先导入以免计入插件的耗时
+PRELOAD = "import asyncio, sqlite3, concurrent.futures, json, logging"
+
+PLUGIN_SCRIPT = """
+import importlib.util, json, resource, sys, time
+{preload}
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("owlv_translator", {init!r}, submodule_search_locations=[{plugin!r}])
+module = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = module
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before,
+    "nodes": len(module.NODE_CLASS_MAPPINGS),
+    "loaded": [name for name in {lazy!r} if name in sys.modules],
+}}))
+"""
+
+DEPENDENCY_SCRIPT = """
+import importlib, json, resource, time
+{preload}
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+try:
+    importlib.import_module({name!r})
+    available = True
+except Exception:
+    available = False
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before,
+    "available": available,
+}}))
+"""
+
+
+def run(script):
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True,
+                            cwd=PLUGIN_DIR).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(script, repeat):
+    runs = [run(script) for _ in range(repeat)]
+    result = dict(runs[-1])
+    result["seconds"] = statistics.median(item["seconds"] for item in runs)
+    result["rss_kb"] = statistics.median(item["rss_kb"] for item in runs)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="每项测量的次数，取中位数")
+    args = parser.parse_args()
+
+    plugin = measure(PLUGIN_SCRIPT.format(preload=PRELOAD, init=os.path.join(PLUGIN_DIR, "__init__.py"),
+                                          plugin=PLUGIN_DIR, lazy=LAZY_MODULES), args.repeat)
+    print(f"plugin import: {plugin['seconds'] * 1000:.1f} ms, +{plugin['rss_kb'] / 1024:.1f} MiB RSS, "
+          f"{plugin['nodes']} nodes registered")
+    print(f"heavy modules loaded at registration: {', '.join(plugin['loaded']) or 'none'}")
+
+    print()
+    print(f"{'deferred dependency':<22}{'import ms':>12}{'RSS MiB':>10}")
+    deferred_seconds = 0.0
+    deferred_kb = 0
+    for name in LAZY_MODULES:
+        dependency = measure(DEPENDENCY_SCRIPT.format(preload=PRELOAD, name=name), args.repeat)
+        if not dependency["available"]:
+            print(f"{name:<22}{'not installed':>22}")
+            continue
+        print(f"{name:<22}{dependency['seconds'] * 1000:>12.1f}{dependency['rss_kb'] / 1024:>10.1f}")
+        if name not in plugin["loaded"]:
+            deferred_seconds += dependency["seconds"]
+            deferred_kb += dependency["rss_kb"]
+    # 依赖之间有共享的子模块（如 googletrans 与 httpx），合计值是上限
+    print(f"{'saved at startup (<=)':<22}{deferred_seconds * 1000:>12.1f}{deferred_kb / 1024:>10.1f}")
+
+    if plugin["loaded"]:
+        sys.exit(f"eagerly imported: {', '.join(plugin['loaded'])}")
+
+
+if __name__ == "__main__":
+    main()
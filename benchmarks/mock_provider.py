@@ -0,0 +1,355 @@
+"""本地模拟服务端：按各服务商的响应格式返回固定长度的译文，用于基准测试与压力测试，不访问外网。
+
+支持的格式（按请求路径区分）：
+- OpenAI chat completions：/v1/chat/completions、/chat/completions、/api/paas/v4/chat/completions 等以 chat/completions 结尾的路径
+- Anthropic messages：/v1/messages
+- Gemini：/v1beta/models/<model>:generateContent 与 :streamGenerateContent
+- DashScope（通义千问）：/api/v1/services/aigc/text-generation/generation
+- Ollama：/api/chat
+- 百度翻译：/api/trans/vip/translate；有道批量翻译：/v2/api；腾讯机器翻译：/（X-TC-Action 请求头）
+
+要求返回 "JSON array of exactly N strings" 的打包请求会得到 N 条译文组成的JSON数组。
+
+可按比例注入故障：限流（LLM 为 HTTP 429，机器翻译为各自的频率超限错误码）、5xx、响应体中途停顿、
+响应体截断（声明完整长度后中途关闭连接）、连接被重置（RST）。
+
+用法：
+    python benchmarks/mock_provider.py --port 8765 --latency 0.05 --payload-size 200
+    python benchmarks/mock_provider.py --fault-429 0.02 --fault-5xx 0.02 --fault-slow 0.01 --fault-reset 0.01
+"""
+import argparse
+import json
+import random
+import re
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STREAM_CHUNK_CHARS = 8
+FAULTS = ("429", "5xx", "slow", "truncate", "reset")
+PACKED_PATTERN = re.compile(r"exactly (\d+) strings")
+
+
+class MockProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, payload_size=200, slow_seconds=2.0, **fault_rates):
+        super().__init__(address, MockProviderHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.payload_size = payload_size
+        self.slow_seconds = slow_seconds
+        # 故障名 -> 概率，如 {"429": 0.02}
+        self.fault_rates = {name: fault_rates.get(f"fault_{name}", 0.0) or 0.0 for name in FAULTS}
+        self.requests = 0
+        self.faults = dict.fromkeys(FAULTS, 0)
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def pick_fault(self):
+        roll = random.random()
+        for name, rate in self.fault_rates.items():
+            if roll < rate:
+                with self._lock:
+                    self.faults[name] += 1
+                return name
+            roll -= rate
+        return None
+
+    def handle_error(self, request, client_address):
+        # 客户端超时断开、注入的连接重置都会在服务端产生写入错误，属于预期情况
+        pass
+
+    def delay(self):
+        latency = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if latency > 0:
+            time.sleep(latency)
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头与响应体分两次写出，关闭 Nagle 算法以免与客户端的延迟确认叠加出约40ms的等待
+    disable_nagle_algorithm = True
+
+    fault = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def write_body(self, body):
+        if self.fault == "slow":
+            # 先发一半，停顿后再发剩余部分，模拟响应体传输缓慢
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            time.sleep(self.server.slow_seconds)
+            self.wfile.write(body[len(body) // 2:])
+        else:
+            self.wfile.write(body)
+
+    # ---- 响应 ----
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.fault == "truncate":
+            # 声明完整长度但只发送一半后关闭连接，客户端读到不完整的响应体
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.write_body(body)
+
+    def send_stream(self, lines, content_type="text/event-stream"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, line in enumerate(lines):
+            if self.fault == "truncate" and index >= len(lines) // 2:
+                # 流中途断开，不发送结束块
+                self.close_connection = True
+                return
+            if self.fault == "slow" and index == len(lines) // 2:
+                time.sleep(self.server.slow_seconds)
+            data = line.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def reset_connection(self):
+        # SO_LINGER 为0时 close 发送 RST，客户端读到 ECONNRESET
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.connection.close()
+        self.close_connection = True
+
+    def output_text(self):
+        match = PACKED_PATTERN.search(self.raw_text)
+        if match:
+            count = int(match.group(1))
+            return json.dumps(["x" * max(1, self.server.payload_size // count)] * count)
+        return "x" * self.server.payload_size
+
+    def output_chunks(self):
+        text = self.output_text()
+        return [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+
+    # ---- 请求分发 ----
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        raw = self.read_body()
+        self.raw_text = raw.decode("utf-8", errors="replace")
+        self.server.count()
+        self.fault = self.server.pick_fault()
+        if self.fault == "reset":
+            return self.reset_connection()
+        self.server.delay()
+        if self.fault == "5xx":
+            self.fault = None
+            return self.send_json({"error": {"message": "upstream overloaded", "type": "server_error"}},
+                                  status=random.choice((500, 502, 503)))
+        self.handle_request(urlsplit(self.path), raw)
+
+    def rate_limited(self):
+        # 限流时各服务商的响应：LLM 为 HTTP 429，机器翻译接口返回200与各自的错误码
+        self.fault = None
+        path = urlsplit(self.path).path
+        if path == "/api/trans/vip/translate":
+            return self.send_json({"error_code": "54003", "error_msg": "Invalid Access Limit"})
+        if path == "/v2/api":
+            return self.send_json({"errorCode": "411"})
+        if self.headers.get("X-TC-Action"):
+            return self.send_json({"Response": {"Error": {"Code": "RequestLimitExceeded",
+                                                          "Message": "Request limit exceeded"}}})
+        return self.send_json({"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                              status=429, headers={"Retry-After": "0.2"})
+
+    def handle_request(self, url, raw):
+        if self.fault == "429":
+            return self.rate_limited()
+        path = url.path
+        if path == "/api/trans/vip/translate":
+            return self.baidu(parse_qs(raw.decode("utf-8")))
+        if path == "/v2/api":
+            return self.youdao(parse_qs(raw.decode("utf-8")))
+        if self.headers.get("X-TC-Action"):
+            return self.tencent(json.loads(raw))
+
+        payload = json.loads(raw) if raw else {}
+        if path.endswith("chat/completions"):
+            return self.openai(payload)
+        if path.endswith("/messages"):
+            return self.anthropic(payload)
+        if ":generateContent" in path or ":streamGenerateContent" in path:
+            return self.gemini(payload, stream=":streamGenerateContent" in path)
+        if path.endswith("/text-generation/generation"):
+            return self.dashscope(payload)
+        if path == "/api/chat":
+            return self.ollama(payload)
+        self.send_json({"error": f"unknown path {path}"}, status=404)
+
+    # ---- LLM 服务商格式 ----
+
+    @staticmethod
+    def prompt_tokens(payload):
+        return max(1, len(json.dumps(payload, ensure_ascii=False)) // 4)
+
+    def openai(self, payload):
+        if payload.get("stream"):
+            events = [{"choices": [{"index": 0, "delta": {"content": chunk}}]} for chunk in self.output_chunks()]
+            return self.send_stream([f"data: {json.dumps(event)}\n\n" for event in events] + ["data: [DONE]\n\n"])
+        text = self.output_text()
+        completion = max(1, len(text) // 4)
+        prompt = self.prompt_tokens(payload)
+        self.send_json({
+            "id": f"chatcmpl-{self.server.requests}",
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion},
+        })
+
+    def anthropic(self, payload):
+        if payload.get("stream"):
+            events = [{"type": "message_start"}]
+            events += [{"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}}
+                       for chunk in self.output_chunks()]
+            events.append({"type": "message_stop"})
+            return self.send_stream([f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events])
+        text = self.output_text()
+        self.send_json({
+            "id": f"msg_{self.server.requests}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": self.prompt_tokens(payload), "output_tokens": max(1, len(text) // 4)},
+        })
+
+    def gemini(self, payload, stream=False):
+        if stream:
+            events = [{"candidates": [{"content": {"parts": [{"text": chunk}], "role": "model"}}]}
+                      for chunk in self.output_chunks()]
+            return self.send_stream([f"data: {json.dumps(event)}\n\n" for event in events])
+        text = self.output_text()
+        prompt = self.prompt_tokens(payload)
+        completion = max(1, len(text) // 4)
+        self.send_json({
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt, "candidatesTokenCount": completion,
+                              "totalTokenCount": prompt + completion},
+        })
+
+    def dashscope(self, payload):
+        if self.headers.get("X-DashScope-SSE") == "enable":
+            events = [{"output": {"text": chunk, "finish_reason": "null"}} for chunk in self.output_chunks()]
+            return self.send_stream([f"data:{json.dumps(event)}\n\n" for event in events])
+        text = self.output_text()
+        self.send_json({
+            "output": {"text": text, "finish_reason": "stop"},
+            "usage": {"input_tokens": self.prompt_tokens(payload), "output_tokens": max(1, len(text) // 4)},
+            "request_id": str(self.server.requests),
+        })
+
+    def ollama(self, payload):
+        if not payload.get("messages"):
+            # 预加载请求
+            return self.send_json({"model": payload.get("model"), "done": True, "done_reason": "load"})
+        if payload.get("stream", True):
+            events = [{"message": {"role": "assistant", "content": chunk}, "done": False}
+                      for chunk in self.output_chunks()]
+            events.append({"message": {"role": "assistant", "content": ""}, "done": True})
+            return self.send_stream([json.dumps(event) + "\n" for event in events], "application/x-ndjson")
+        text = self.output_text()
+        self.send_json({
+            "model": payload.get("model"),
+            "message": {"role": "assistant", "content": text},
+            "done": True,
+            "prompt_eval_count": self.prompt_tokens(payload),
+            "eval_count": max(1, len(text) // 4),
+        })
+
+    # ---- 机器翻译格式：译文为原文的大写形式，长度与原文一致 ----
+
+    def baidu(self, form):
+        lines = form.get("q", [""])[0].split("\n")
+        self.send_json({"from": "en", "to": form.get("to", [""])[0],
+                        "trans_result": [{"src": line, "dst": line.upper()} for line in lines]})
+
+    def youdao(self, form):
+        self.send_json({"errorCode": "0", "errorIndex": [],
+                        "translateResults": [{"query": q, "translation": q.upper(), "type": "en2zh-CHS"}
+                                             for q in form.get("q", [])]})
+
+    def tencent(self, payload):
+        self.send_json({"Response": {"Source": "en", "Target": payload.get("Target"),
+                                     "TargetTextList": [text.upper() for text in payload.get("SourceTextList", [])],
+                                     "RequestId": str(self.server.requests)}})
+
+
+def start_mock_provider(*args, timeout=10.0):
+    """在子进程中启动模拟服务端（避免其CPU开销计入被测进程），返回 (进程, 基础URL)"""
+    process = subprocess.Popen([sys.executable, __file__, "--port", "0", *map(str, args)],
+                               stdout=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        line = process.stdout.readline()
+        match = re.search(r"listening on (http://\S+)", line or "")
+        if match:
+            return process, match.group(1)
+        if process.poll() is not None:
+            break
+    process.kill()
+    raise RuntimeError("mock provider failed to start")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的服务端延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟的随机波动范围（秒）")
+    parser.add_argument("--payload-size", type=int, default=200, help="LLM 响应文本的字符数")
+    parser.add_argument("--slow-seconds", type=float, default=2.0, help="slow 故障中响应体停顿的秒数")
+    for name in FAULTS:
+        parser.add_argument(f"--fault-{name}", type=float, default=0.0, help=f"注入 {name} 故障的概率")
+    return parser
+
+
+def stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    args = build_parser().parse_args()
+    options = {key: value for key, value in vars(args).items() if key not in ("host", "port")}
+    server = MockProviderServer((args.host, args.port), **options)
+    print(f"listening on http://{args.host}:{server.server_port}", flush=True)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    # 退出时输出请求数与实际注入的故障数
+    print(json.dumps({"requests": server.requests, "faults": server.faults}), flush=True)
+
+if __name__ == "__main__":
+    main()
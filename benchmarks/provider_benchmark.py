@@ -0,0 +1,151 @@
+"""连接器与翻译路径的吞吐基准。
+
+在子进程中启动本地模拟服务端（benchmarks/mock_provider.py），在不同并发数下调用 llm_connectors 中的每个连接器、
+GeminiConnector 以及 TranslatorNode 的百度/有道/腾讯翻译，输出每秒请求数、p50/p99 延迟和每次调用的客户端CPU时间。
+服务端延迟固定，因此这些数值的变化反映的是插件自身的开销。
+
+用法：
+    python benchmarks/provider_benchmark.py
+    python benchmarks/provider_benchmark.py --concurrency 1 8 32 --requests 500 --latency 0.02 --stream
+    python benchmarks/provider_benchmark.py --only OpenAI Claude 百度翻译 --json results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import (build_connectors, disable_rate_limits, load_plugin, percentile, redirect_translators,
+                    translator_credentials)
+from mock_provider import start_mock_provider
+
+TRANSLATOR_SERVICES = ["百度翻译", "有道翻译", "腾讯翻译"]
+
+
+def sample_text(size):
+    sentence = "The quick brown fox jumps over the lazy dog. "
+    return (sentence * (size // len(sentence) + 1))[:size].strip()
+
+
+def pad(text, width):
+    """按显示宽度左对齐，中文字符占两列"""
+    columns = sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+    return text + " " * max(0, width - columns)
+
+
+def run_level(call, concurrency, requests, warmup):
+    """以 concurrency 个线程共执行 requests 次 call()，返回统计结果"""
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def one(_):
+        started = time.perf_counter()
+        try:
+            call()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                errors.append(error)
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "rps": requests / wall if wall > 0 else None,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_ms_per_call": cpu / requests * 1000,
+    }
+
+
+def connector_call(connector, text, stream):
+    messages = [{"role": "system", "content": "Translate to Chinese."}, {"role": "user", "content": text}]
+    if stream:
+        return lambda: connector.invoke_stream(messages, max_tokens=256)
+    return lambda: connector.invoke(messages, max_tokens=256)
+
+
+def translator_call(node, service, text):
+    credentials = translator_credentials(service)
+
+    def call():
+        result = node.translate([text], ["中文"], [service], use_cache=[False], qps=[1e6], **credentials)[0][0]
+        if result != text.upper():
+            raise RuntimeError(result)
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="每个并发等级的请求数")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.01, help="模拟服务端延迟（秒）")
+    parser.add_argument("--payload-size", type=int, default=200, help="LLM 响应文本的字符数")
+    parser.add_argument("--text-size", type=int, default=200, help="请求文本的字符数")
+    parser.add_argument("--stream", action="store_true", help="LLM 连接器使用流式接口")
+    parser.add_argument("--only", nargs="+", help="只测这些目标（连接器名或翻译服务名）")
+    parser.add_argument("--json", help="把结果写入该JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示插件自身的日志输出")
+    args = parser.parse_args()
+
+    plugin = load_plugin()
+    disable_rate_limits()
+    process, base_url = start_mock_provider("--latency", args.latency, "--payload-size", args.payload_size)
+    try:
+        redirect_translators(base_url)
+        text = sample_text(args.text_size)
+        targets = {name: connector_call(connector, text, args.stream)
+                   for name, connector in build_connectors(base_url).items()}
+        node = plugin.NODE_CLASS_MAPPINGS["TranslatorNode"]()
+        targets.update({service: translator_call(node, service, text) for service in TRANSLATOR_SERVICES})
+        if args.only:
+            targets = {name: call for name, call in targets.items() if name in args.only}
+
+        print(f"mock provider {base_url}: latency={args.latency * 1000:.0f}ms, payload={args.payload_size} chars, "
+              f"text={args.text_size} chars, stream={args.stream}")
+        print(f"{pad('target', 14)}{'conc':>6}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'cpu ms/call':>13}{'errors':>8}")
+        results = []
+        for name, call in targets.items():
+            for concurrency in args.concurrency:
+                # 插件会为每次调用打印日志，默认不显示，以免淹没结果表
+                with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+                    result = {"target": name, **run_level(call, concurrency, args.requests, args.warmup)}
+                results.append(result)
+                print(f"{pad(name, 14)}{concurrency:>6}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}"
+                      f"{result['p99_ms']:>10.2f}{result['cpu_ms_per_call']:>13.3f}{result['errors']:>8}")
+                if result["first_error"]:
+                    print(f"    first error: {result['first_error'][:200]}")
+    finally:
+        process.terminate()
+        process.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
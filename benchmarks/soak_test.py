@@ -0,0 +1,374 @@
+"""长时间压力测试（soak test）：带故障注入的端到端回放。
+
+在子进程中启动注入故障的模拟服务端（429、5xx、响应体停顿、响应体截断、连接重置），按 ComfyUI 队列的方式
+逐个执行数千次 LLMTranslatorNode / LLMBatchTranslatorNode / TranslatorNode，文本长度与语言混合。
+运行期间定期采样内存 (RSS)、线程数、打开的套接字与文件描述符，以及各缓存/连接池/注册表的大小；
+同时检查输出中是否泄露密钥或 traceback，以及错误信息是否被写入翻译缓存。
+
+只依赖 Linux 的 /proc，不访问外网，适合在 CI 中运行；超过阈值时以非0状态退出。
+
+用法：
+    python benchmarks/soak_test.py --duration 300
+    python benchmarks/soak_test.py --duration 14400 --workers 2 --sample-interval 60 --json soak.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import FAKE_KEY, build_connectors, disable_rate_limits, load_plugin, plugin_module, redirect_translators, \
+    translator_credentials
+from mock_provider import FAULTS, start_mock_provider
+
+LLM_PROVIDERS = ["OpenAI", "DeepSeek", "Claude", "Gemini", "Qwen", "Ollama"]
+TRANSLATOR_SERVICES = ["百度翻译", "有道翻译", "腾讯翻译"]
+TARGET_LANGUAGES = ["英语", "中文", "日语", "韩语", "法语", "德语", "西班牙语", "意大利语", "俄语", "葡萄牙语"]
+
+SAMPLE_TEXTS = {
+    "en": "A lighthouse on a rocky cliff at dusk, waves crashing below, dramatic clouds, cinematic lighting.",
+    "zh": "黄昏时分悬崖上的灯塔，海浪拍打着礁石，天空中云层翻涌，电影感的光影。",
+    "ja": "夕暮れの岩だらけの崖に立つ灯台、打ち寄せる波、ドラマチックな雲、映画のような光。",
+    "ko": "해질녘 바위 절벽 위의 등대, 아래로 부서지는 파도, 극적인 구름, 영화 같은 조명.",
+    "fr": "Un phare sur une falaise rocheuse au crépuscule, les vagues se brisent, nuages dramatiques.",
+    "de": "Ein Leuchtturm auf einer felsigen Klippe in der Dämmerung, brechende Wellen, dramatische Wolken.",
+    "ru": "Маяк на скалистом утёсе в сумерках, разбивающиеся волны, драматичные облака.",
+}
+TAGS = ["masterpiece", "best quality", "1girl", "cherry blossoms", "night sky", "red umbrella", "city street"]
+
+
+class QueueGenerator:
+    """生成与 ComfyUI 队列相似的任务：多数是短提示词，少量长文本与列表输入"""
+
+    def __init__(self, seed, repeat_ratio=0.3):
+        self.random = random.Random(seed)
+        self.repeat_ratio = repeat_ratio
+        self.counter = 0
+
+    def text(self):
+        rnd = self.random
+        size = rnd.choices(["tag", "sentence", "paragraph", "long"], weights=[40, 35, 20, 5])[0]
+        if size == "tag":
+            text = ", ".join(rnd.sample(TAGS, rnd.randint(1, 4)))
+        else:
+            base = SAMPLE_TEXTS[rnd.choice(list(SAMPLE_TEXTS))]
+            text = {"sentence": base, "paragraph": " ".join([base] * 4),
+                    "long": "\n\n".join(" ".join([base] * 6) for _ in range(12))}[size]
+        # 一部分任务重复出现（命中缓存），其余加上编号，使缓存持续增长以检验其上限
+        if rnd.random() >= self.repeat_ratio:
+            self.counter += 1
+            text = f"{text} #{self.counter}"
+        return text
+
+    def item(self):
+        rnd = self.random
+        kind = rnd.choices(["llm", "llm_list", "llm_batch", "translator"], weights=[40, 15, 15, 30])[0]
+        item = {"kind": kind, "target_language": rnd.choice(TARGET_LANGUAGES)}
+        if kind == "translator":
+            item["service"] = rnd.choice(TRANSLATOR_SERVICES)
+            item["texts"] = [self.text() for _ in range(rnd.randint(1, 10))]
+        else:
+            item["provider"] = rnd.choice(LLM_PROVIDERS)
+            count = 1 if kind == "llm" else rnd.randint(2, 12)
+            item["texts"] = [self.text() for _ in range(count)]
+            item["stream"] = kind == "llm" and rnd.random() < 0.1
+        return item
+
+
+class Runner:
+    def __init__(self, plugin, clients):
+        self.clients = clients
+        self.nodes = {
+            "llm": plugin.NODE_CLASS_MAPPINGS["LLMTranslatorNode"](),
+            "llm_batch": plugin.NODE_CLASS_MAPPINGS["LLMBatchTranslatorNode"](),
+            "translator": plugin.NODE_CLASS_MAPPINGS["TranslatorNode"](),
+        }
+        self.is_error_text = plugin_module("translation_cache").is_error_text
+        self.executions = 0
+        self.items = 0
+        self.errors = Counter()
+        self.leaks = Counter()
+        self.examples = {}
+        self.lock = threading.Lock()
+
+    def execute(self, item, clients=None):
+        texts = item["texts"]
+        clients = clients or self.clients
+        if item["kind"] == "translator":
+            outputs = self.nodes["translator"].translate(
+                texts, [item["target_language"]], [item["service"]], use_cache=[True], qps=[1e6],
+                **translator_credentials(item["service"]))[0]
+            label = item["service"]
+        elif item["kind"] == "llm_batch":
+            outputs = self.nodes["llm_batch"].translate(
+                [clients[item["provider"]]], ["\n".join(t.replace("\n", " ") for t in texts)],
+                [item["target_language"]], use_cache=[True])[0]
+            label = f"{item['provider']} batch"
+        else:
+            outputs = self.nodes["llm"].translate(
+                [clients[item["provider"]]], texts, [item["target_language"]], use_cache=[True],
+                stream=[item["stream"]])[0]
+            label = item["provider"]
+        self.check(label, outputs)
+
+    def check(self, label, outputs):
+        with self.lock:
+            self.executions += 1
+            for output in outputs:
+                self.items += 1
+                if FAKE_KEY in output:
+                    self.leak("secret in output", output)
+                if "Traceback (most recent call last)" in output:
+                    self.leak("traceback in output", output)
+                if self.is_error_text(output):
+                    category = f"{label}: {output.split(':', 1)[0][:40]}"
+                    self.errors[category] += 1
+                    self.examples.setdefault(category, output[:300])
+
+    def leak(self, kind, output):
+        self.leaks[kind] += 1
+        self.examples.setdefault(kind, output[:300])
+
+
+def read_proc():
+    """当前进程的 RSS、线程数、打开的文件描述符与套接字数"""
+    rss_kb = 0
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+    fds = os.listdir("/proc/self/fd")
+    sockets = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                sockets += 1
+        except OSError:
+            pass
+    return {"rss_mb": rss_kb / 1024, "threads": len(os.listdir("/proc/self/task")), "fds": len(fds),
+            "sockets": sockets}
+
+
+def cached_errors(cache_path, is_error_text):
+    """翻译缓存（内存与SQLite）中错误信息的条数，应始终为0"""
+    memory = plugin_module("translation_cache").get_memory_cache()
+    with memory._lock:
+        values = [value for value, _ in memory._data.values()]
+    count = sum(1 for value in values if is_error_text(value))
+    if os.path.exists(cache_path):
+        conn = sqlite3.connect(cache_path)
+        conn.create_function("is_error_text", 1, lambda value: int(is_error_text(value)))
+        try:
+            count += conn.execute("SELECT COUNT(*) FROM translations WHERE is_error_text(value)").fetchone()[0]
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            conn.close()
+    return count
+
+
+def sample(runner, started, cache_path):
+    translation_cache = plugin_module("translation_cache")
+    item = {"t": round(time.monotonic() - started, 1), "executions": runner.executions, "items": runner.items,
+            **read_proc()}
+    item.update({
+        "memory_cache": translation_cache.get_memory_cache().stats()["entries"],
+        "sessions": len(plugin_module("http_pool").get_session_pool()),
+        "controllers": len(plugin_module("adaptive_concurrency").controller_snapshots()),
+        "connectors": len(plugin_module("connector_registry").get_connector_registry()),
+        "stats_keys": len(plugin_module("provider_stats").get_stats_store().snapshot()),
+        "cached_errors": cached_errors(cache_path, translation_cache.is_error_text),
+    })
+    return item
+
+
+def closed_port_url():
+    """一个没有进程监听的本地地址，连接会被拒绝"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def probe_unreachable(runner):
+    """连接被拒绝时的错误信息包含请求URL，逐个连接器与翻译服务检查其中是否带出密钥"""
+    base_url = closed_port_url()
+    for name, client in build_clients(base_url).items():
+        client.config["connector"].retry_policy = plugin_module("retry_policy").RetryPolicy(max_retries=0)
+        runner.execute({"kind": "llm", "provider": name, "texts": [f"unreachable probe {name}"],
+                        "target_language": "英语", "stream": False}, clients={name: client})
+    segment_packer = plugin_module("segment_packer")
+    urls = {translator: translator.url for translator in (segment_packer.BaiduBatchTranslator,
+                                                         segment_packer.YoudaoBatchTranslator,
+                                                         segment_packer.TencentBatchTranslator)}
+    redirect_translators(base_url)
+    try:
+        for service in TRANSLATOR_SERVICES:
+            runner.execute({"kind": "translator", "service": service, "texts": [f"unreachable probe {service}"],
+                            "target_language": "英语"})
+    finally:
+        for translator, url in urls.items():
+            translator.url = url
+
+
+def build_clients(base_url):
+    llm_client = plugin_module("llm_client")
+    retry_policy = plugin_module("retry_policy")
+    clients = {}
+    for name, connector in build_connectors(base_url).items():
+        if name not in LLM_PROVIDERS:
+            continue
+        # 缩短退避时间，让重试路径在有限时长内被充分执行
+        connector.retry_policy = retry_policy.RetryPolicy(max_retries=2, base_delay=0.05, max_delay=0.5, deadline=15)
+        connector.timeout = 10
+        clients[name] = llm_client.LLMClient(kind="ollama" if name == "Ollama" else "service", config={
+            "provider": name, "model": connector.model, "api_key": FAKE_KEY, "connector": connector})
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=300, help="运行时长（秒）")
+    parser.add_argument("--executions", type=int, default=0, help="执行的任务数上限，0为不限")
+    parser.add_argument("--workers", type=int, default=1, help="并行执行队列的线程数（ComfyUI 为1）")
+    parser.add_argument("--sample-interval", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.005, help="模拟服务端延迟（秒）")
+    parser.add_argument("--slow-seconds", type=float, default=1.0)
+    parser.add_argument("--fault-429", type=float, default=0.03)
+    parser.add_argument("--fault-5xx", type=float, default=0.03)
+    parser.add_argument("--fault-slow", type=float, default=0.01)
+    parser.add_argument("--fault-truncate", type=float, default=0.01)
+    parser.add_argument("--fault-reset", type=float, default=0.01)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64,
+                        help="预热后 RSS 允许增长的上限（MiB）")
+    parser.add_argument("--max-threads", type=int, default=64)
+    parser.add_argument("--max-sockets", type=int, default=64)
+    parser.add_argument("--json", help="把采样与结果写入该JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示插件自身的日志输出")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="owlv-soak-")
+    cache_path = os.path.join(cache_dir, "translation_cache.sqlite3")
+    os.environ["OWLV_TRANSLATOR_CACHE"] = "1"
+    os.environ["OWLV_TRANSLATOR_CACHE_PATH"] = cache_path
+    plugin = load_plugin()
+    disable_rate_limits()
+
+    fault_args = []
+    for name in FAULTS:
+        fault_args += [f"--fault-{name}", getattr(args, f"fault_{name}")]
+    process, base_url = start_mock_provider("--latency", args.latency, "--slow-seconds", args.slow_seconds,
+                                            *fault_args)
+    runner = Runner(plugin, build_clients(base_url))
+    with open(os.devnull, "w") as devnull, \
+            contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+        probe_unreachable(runner)
+    redirect_translators(base_url)
+    generator = QueueGenerator(args.seed)
+    generator_lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + args.duration
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set() and time.monotonic() < deadline:
+            with generator_lock:
+                if args.executions and runner.executions >= args.executions:
+                    return
+                item = generator.item()
+            runner.execute(item)
+
+    def report(line):
+        print(line, file=sys.__stdout__, flush=True)
+
+    samples = []
+    report(f"soak: {base_url}, duration={args.duration:.0f}s, workers={args.workers}, faults="
+           + ", ".join(f"{name}={getattr(args, f'fault_{name}'):.0%}" for name in FAULTS))
+    # 插件会为每次调用与每次重试打印日志，默认丢弃
+    with open(os.devnull, "w") as devnull, \
+            contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+        threads = [threading.Thread(target=worker, name=f"soak-worker-{i}", daemon=True)
+                   for i in range(args.workers)]
+        for thread in threads:
+            thread.start()
+        next_sample = started
+        while any(thread.is_alive() for thread in threads):
+            if time.monotonic() >= next_sample:
+                samples.append(sample(runner, started, cache_path))
+                s = samples[-1]
+                report(f"[{s['t']:>8.1f}s] executions={s['executions']} rss={s['rss_mb']:.1f}MiB "
+                       f"threads={s['threads']} sockets={s['sockets']} fds={s['fds']} "
+                       f"memory_cache={s['memory_cache']} sessions={s['sessions']} "
+                       f"controllers={s['controllers']} cached_errors={s['cached_errors']}")
+                next_sample += args.sample_interval
+            time.sleep(0.2)
+        stop.set()
+        samples.append(sample(runner, started, cache_path))
+
+    process.terminate()
+    output, _ = process.communicate(timeout=10)
+    server = json.loads(output.strip().splitlines()[-1]) if output.strip() else {}
+
+    # 以运行时长10%处的采样作为基线，排除模块导入与连接池预热带来的增长
+    baseline = next((s for s in samples if s["t"] >= args.duration * 0.1), samples[0])
+    final = samples[-1]
+    summary = {
+        "executions": runner.executions,
+        "items": runner.items,
+        "elapsed": final["t"],
+        "server": server,
+        "rss_growth_mb": final["rss_mb"] - baseline["rss_mb"],
+        "max_threads": max(s["threads"] for s in samples),
+        "max_sockets": max(s["sockets"] for s in samples),
+        "cached_errors": max(s["cached_errors"] for s in samples),
+        "errors": dict(runner.errors.most_common()),
+        "leaks": dict(runner.leaks),
+        "examples": runner.examples,
+    }
+
+    report("")
+    report(f"executions={summary['executions']} items={summary['items']} in {summary['elapsed']:.0f}s; "
+           f"mock requests={server.get('requests')} faults={server.get('faults')}")
+    report(f"rss growth after warm-up: {summary['rss_growth_mb']:+.1f} MiB, max threads {summary['max_threads']}, "
+           f"max sockets {summary['max_sockets']}")
+    report("error outputs by node/provider:")
+    for category, count in runner.errors.most_common():
+        report(f"  {count:>6}  {category}")
+        report(f"          e.g. {runner.examples[category][:160]!r}")
+
+    failures = []
+    if summary["rss_growth_mb"] > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {summary['rss_growth_mb']:.1f} MiB (limit {args.max_rss_growth_mb})")
+    if summary["max_threads"] > args.max_threads:
+        failures.append(f"{summary['max_threads']} threads (limit {args.max_threads})")
+    if summary["max_sockets"] > args.max_sockets:
+        failures.append(f"{summary['max_sockets']} open sockets (limit {args.max_sockets})")
+    if summary["cached_errors"]:
+        failures.append(f"{summary['cached_errors']} error strings stored in the translation cache")
+    for kind, count in runner.leaks.items():
+        failures.append(f"{count} outputs with {kind}, e.g. {runner.examples[kind][:160]!r}")
+    summary["failures"] = failures
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "summary": summary, "samples": samples}, f, ensure_ascii=False, indent=2)
+
+    if failures:
+        report("FAILED:")
+        for failure in failures:
+            report(f"  {failure}")
+        sys.exit(1)
+    report("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_MAX_WORKERS = 4
+MAX_WORKERS_LIMIT = 32
+# 每个服务商在整个进程内允许的最大并发请求数
+DEFAULT_PROVIDER_CONCURRENCY = 8
+PROVIDER_CONCURRENCY = {
+    "Google翻译": 4,
+    "百度翻译": 2,
+    "有道翻译": 4,
+    "腾讯翻译": 4,
+}
+
+_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_semaphores_lock = threading.Lock()
+
+
+def scalar_input(value, default=None):
+    """INPUT_IS_LIST 模式下的标量输入取第一个元素"""
+    if isinstance(value, list):
+        return value[0] if value else default
+    return value if value is not None else default
+
+
+def list_input(value) -> List[Any]:
+    """INPUT_IS_LIST 模式下的列表输入；直接调用时传入的标量包装为单元素列表"""
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def get_provider_semaphore(provider_key: str, limit: Optional[int] = None) -> threading.BoundedSemaphore:
+    """返回服务商共享的并发信号量，同一服务商的所有节点共用一个上限"""
+    with _semaphores_lock:
+        semaphore = _semaphores.get(provider_key)
+        if semaphore is None:
+            limit = limit or PROVIDER_CONCURRENCY.get(provider_key, DEFAULT_PROVIDER_CONCURRENCY)
+            semaphore = threading.BoundedSemaphore(max(1, limit))
+            _semaphores[provider_key] = semaphore
+        return semaphore
+
+
+def run_concurrently(func: Callable[[Any], Any], items: Sequence[Any], max_workers: int = DEFAULT_MAX_WORKERS,
+                     provider_key: str = "") -> Tuple[List[Any], List[Optional[Exception]]]:
+    """在有界线程池中并发执行 func(item)。
+
+    返回 (results, errors)，二者与 items 顺序一致；单条失败只记录在 errors 中，不影响其它条目。
+    """
+    results: List[Any] = [None] * len(items)
+    errors: List[Optional[Exception]] = [None] * len(items)
+    semaphore = get_provider_semaphore(provider_key) if provider_key else None
+
+    def run(index: int):
+        try:
+            if semaphore is None:
+                results[index] = func(items[index])
+            else:
+                with semaphore:
+                    results[index] = func(items[index])
+        except Exception as e:
+            errors[index] = e
+
+    workers = max(1, min(int(max_workers or 1), MAX_WORKERS_LIMIT, len(items) or 1))
+    if workers == 1:
+        for i in range(len(items)):
+            run(i)
+        return results, errors
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="owlv-translate") as executor:
+        list(executor.map(run, range(len(items))))
+    return results, errors
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """返回常驻后台线程中的事件循环，供同步节点调用异步接口（aiohttp会话可跨调用复用）"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="owlv-event-loop", daemon=True)
+            thread.start()
+        return _loop
+
+
+def run_coroutine_sync(coro, timeout: Optional[float] = None):
+    """在后台事件循环中执行协程并阻塞等待结果"""
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop()).result(timeout)
+
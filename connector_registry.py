@@ -0,0 +1,76 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .translation_cache import fingerprint_secret
+
+
+DEFAULT_MAX_CLIENTS = int(os.environ.get("OWLV_MAX_LIVE_CLIENTS", "32"))
+
+
+class ConnectorRegistry:
+    """进程内的连接器注册表。
+
+    以 (服务商, URL, 模型, 密钥指纹, 选项) 为键保存已创建的 LLMClient，
+    输入不变时连接器节点直接复用，超过 max_clients 时淘汰最久未使用的客户端。
+    """
+
+    def __init__(self, max_clients: int = DEFAULT_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(provider: str, model: str, api_token: str, api_url: str = "", options: tuple = ()) -> tuple:
+        return (provider or "", api_url or "", model or "", fingerprint_secret(api_token or ""), tuple(options))
+
+    def get_or_create(self, provider: str, model: str, api_token: str, factory: Callable[[], object],
+                      api_url: str = "", options: tuple = ()):
+        """返回已存在的客户端，不存在时调用 factory() 创建并登记。
+
+        options 为影响客户端行为的其它节点参数（如重试设置），参与键的计算。
+        """
+        key = self.make_key(provider, model, api_token, api_url, options)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+        # 在锁外创建，避免慢速初始化阻塞其它节点
+        client = factory()
+        with self._lock:
+            existing = self._clients.get(key)
+            if existing is not None:
+                self._clients.move_to_end(key)
+                return existing
+            self._clients[key] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def evict(self, provider: Optional[str] = None, model: Optional[str] = None) -> int:
+        """淘汰匹配的客户端（参数为空时匹配全部），返回淘汰数量"""
+        with self._lock:
+            keys = [
+                key for key in self._clients
+                if (provider is None or key[0] == provider) and (model is None or key[2] == model)
+            ]
+            for key in keys:
+                del self._clients[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+
+_registry = ConnectorRegistry()
+
+
+def get_connector_registry() -> ConnectorRegistry:
+    return _registry
@@ -1,17 +1,21 @@
 import traceback
-import requests
 from typing import Tuple
 
+from .connector_registry import get_connector_registry
 from .llm_client import LLMClient
 from .llm_connectors import GeneralLLMServiceConnector
+from .retry_policy import DEFAULT_DEADLINE, DEFAULT_MAX_RETRIES, RetryPolicy
 
 
 class GeminiConnector(GeneralLLMServiceConnector):
     """Google Gemini API 连接器"""
+
+    provider = "Gemini"
+    max_output_tokens = 8192
     
     def __init__(self, api_token, model):
-        # Gemini API URL 格式特殊，需要包含 API key
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_token}"
+        # API key 放在 x-goog-api-key 请求头中，不出现在URL里（连接错误信息会包含URL）
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
         super().__init__(url, api_token, model)
 
     def generate_payload(self, messages, **kwargs):
@@ -30,31 +34,43 @@ class GeminiConnector(GeneralLLMServiceConnector):
             }
         }
 
-    def invoke(self, messages, **kwargs):
-        """Gemini API 使用不同的请求格式"""
-        payload = self.generate_payload(messages, **kwargs)
-        headers = {
-            "Content-Type": "application/json"
+    def build_headers(self):
+        """Gemini API 通过 x-goog-api-key 请求头鉴权"""
+        return {
+            "Content-Type": "application/json",
+            "x-goog-api-key": self.api_token,
         }
-        
+
+    def parse_response(self, response_data):
         try:
-            response = requests.post(self.api_url, json=payload, headers=headers, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                try:
-                    return response_data["candidates"][0]["content"]["parts"][0]["text"]
-                except KeyError:
-                    raise ValueError("Unexpected response format: missing 'candidates[0].content.parts[0].text'.")
-            elif response.status_code == 401:
-                raise Exception("Unauthorized: invalid or missing API key.")
-            else:
-                raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
-                
-        except requests.exceptions.Timeout:
-            raise Exception(f"Request timed out after {self.timeout} seconds.")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Request error: {str(e)}")
+            return response_data["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError):
+            raise ValueError("Unexpected response format: missing 'candidates[0].content.parts[0].text'.")
+
+    def finish_reason(self, response_data):
+        try:
+            return response_data["candidates"][0].get("finishReason")
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return None
+
+    def parse_usage(self, response_data):
+        usage = response_data.get("usageMetadata") if isinstance(response_data, dict) else None
+        if not isinstance(usage, dict):
+            return None
+        return {"prompt": usage.get("promptTokenCount"), "completion": usage.get("candidatesTokenCount")}
+
+    def stream_url(self):
+        return self.api_url.replace(":generateContent", ":streamGenerateContent?alt=sse", 1)
+
+    def stream_payload(self, payload):
+        # Gemini 通过 streamGenerateContent 端点流式输出，载荷不变
+        return payload
+
+    def parse_stream_event(self, event):
+        try:
+            return event["candidates"][0]["content"]["parts"][0].get("text") or ""
+        except (KeyError, IndexError):
+            return ""
 
 
 class GeminiServiceConnectorNode:
@@ -81,6 +97,11 @@ class GeminiServiceConnectorNode:
                         "placeholder": "Enter custom model ID (used when model_select is 'Custom')",
                     },
                 ),
+                "max_retries": ("INT", {"default": DEFAULT_MAX_RETRIES, "min": 0, "max": 10}),
+                "retry_deadline": ("FLOAT", {"default": DEFAULT_DEADLINE, "min": 1.0, "max": 600.0, "step": 1.0}),
+                # 客户端限流：-1 使用服务商默认配额（或环境变量 OWLV_RATE_LIMIT_<服务商>），0 不限制
+                "rpm_limit": ("INT", {"default": -1, "min": -1, "max": 1000000}),
+                "tpm_limit": ("INT", {"default": -1, "min": -1, "max": 1000000000}),
             },
         }
 
@@ -89,22 +110,31 @@ class GeminiServiceConnectorNode:
     FUNCTION = "execute"
     CATEGORY = "Text Processing/LLM"
 
-    def execute(self, api_key: str, model_select: str, custom_model_id: str = "") -> Tuple[object]:
+    def execute(self, api_key: str, model_select: str, custom_model_id: str = "",
+                max_retries: int = DEFAULT_MAX_RETRIES, retry_deadline: float = DEFAULT_DEADLINE,
+                rpm_limit: int = -1, tpm_limit: int = -1) -> Tuple[object]:
         try:
             # 确定最终使用的模型
             model = custom_model_id if model_select == "Custom" and custom_model_id.strip() else model_select
             
-            # 创建 Gemini Connector
-            connector = GeminiConnector(api_key, model)
-            
-            # 封装到 LLMClient
-            config = {
-                "provider": "Gemini",
-                "model": model,
-                "api_key": api_key,
-                "connector": connector,
-            }
-            client = LLMClient(kind="service", config=config)
+            def build_client():
+                # 创建 Gemini Connector
+                connector = GeminiConnector(api_key, model)
+                connector.retry_policy = RetryPolicy(max_retries=max_retries, deadline=retry_deadline)
+                connector.rate_limits = (rpm_limit, tpm_limit)
+                
+                # 封装到 LLMClient
+                config = {
+                    "provider": "Gemini",
+                    "model": model,
+                    "api_key": api_key,
+                    "connector": connector,
+                }
+                return LLMClient(kind="service", config=config)
+
+            # 输入不变时复用已登记的客户端，保留其连接与运行状态
+            client = get_connector_registry().get_or_create("Gemini", model, api_key, build_client,
+                                                            options=(max_retries, retry_deadline, rpm_limit, tpm_limit))
             return (client,)
             
         except Exception as e:
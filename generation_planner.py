@@ -0,0 +1,81 @@
+import math
+import re
+from typing import Any, Dict
+
+from .token_utils import count_cjk, estimate_tokens
+
+
+# 翻译需要稳定、可复现的输出：贪心解码，且不惩罚重复出现的术语
+DETERMINISTIC_PARAMS = {"temperature": 0.0, "frequency_penalty": 0.0}
+
+CJK_TARGETS = {"中文", "日语", "韩语", "Chinese", "Japanese", "Korean"}
+# 按 estimate_tokens 的口径，译文token数相对原文的大致比例
+LATIN_TO_CJK_RATIO = 1.6
+CJK_TO_LATIN_RATIO = 0.8
+SAME_SCRIPT_RATIO = 1.1
+# 在预期长度之上预留的余量，避免译文被截断
+OUTPUT_MARGIN = 1.25
+OUTPUT_OVERHEAD_TOKENS = 64
+# 规划出的 max_tokens 不低于此值（即原先固定的默认值），短文本的译文偏长或模型多输出几句时不至于被截断
+MIN_MAX_TOKENS = 512
+# 任意方向上最大的输出/输入比例，用于反推每段输入的预算
+MAX_OUTPUT_RATIO = LATIN_TO_CJK_RATIO * OUTPUT_MARGIN
+
+
+# 推理模型（OpenAI o系列、DeepSeek-R1/reasoner、GLM-Z1、Qwen3、QwQ 等）：思考过程也计入输出token，
+# o系列还不接受 max_tokens 与非默认的 temperature
+_OPENAI_REASONING = re.compile(r"(^|/)o\d+(-|$)", re.I)
+_REASONING = re.compile(r"reason|(^|[-/_])r1($|[-_])|glm-z1|qwen3|qwq|think", re.I)
+
+
+def is_openai_reasoning_model(model: str) -> bool:
+    return bool(_OPENAI_REASONING.search(model or ""))
+
+
+def is_reasoning_model(model: str) -> bool:
+    return is_openai_reasoning_model(model) or bool(_REASONING.search(model or ""))
+
+
+def cjk_ratio(text: str) -> float:
+    """非空白字符中中日韩文字所占的比例"""
+    visible = len("".join(text.split()))
+    if not visible:
+        return 0.0
+    return count_cjk(text) / visible
+
+
+def expected_output_tokens(text: str, target_language: str) -> int:
+    """估算译文的token数：同一文字体系长度相近，拉丁文与中日韩文字互译时按比例换算"""
+    source_cjk = cjk_ratio(text) >= 0.5
+    target_cjk = target_language in CJK_TARGETS
+    if source_cjk == target_cjk:
+        ratio = SAME_SCRIPT_RATIO
+    else:
+        ratio = LATIN_TO_CJK_RATIO if target_cjk else CJK_TO_LATIN_RATIO
+    return int(math.ceil(estimate_tokens(text) * ratio))
+
+
+def plan_generation(text: str, target_language: str, max_output_tokens: int = 4096,
+                    deterministic: bool = True, reasoning: bool = False, **overrides) -> Dict[str, Any]:
+    """为一次翻译请求确定生成参数。
+
+    max_tokens 取预期译文长度加余量，不低于 MIN_MAX_TOKENS、不超过模型上限；deterministic 为 True 时使用贪心解码。
+    reasoning 为 True（推理模型）时 max_tokens 取模型上限，且不改动采样参数。
+    overrides 中值不为 None 的项（如节点传入的 temperature、max_tokens）优先。
+    """
+    if reasoning:
+        params: Dict[str, Any] = {"max_tokens": max_output_tokens}
+    else:
+        planned = int(expected_output_tokens(text, target_language) * OUTPUT_MARGIN) + OUTPUT_OVERHEAD_TOKENS
+        params = {"max_tokens": min(max_output_tokens, max(MIN_MAX_TOKENS, planned))}
+        if deterministic:
+            params.update(DETERMINISTIC_PARAMS)
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    if params.get("max_tokens") is not None:
+        params["max_tokens"] = max(1, min(int(params["max_tokens"]), max_output_tokens))
+    return params
+
+
+def generation_key(params: Dict[str, Any]) -> str:
+    """生成参数在缓存键中的表示，按参数名排序"""
+    return ",".join(f"{key}={params[key]}" for key in sorted(params) if params[key] is not None)
@@ -0,0 +1,124 @@
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Sequence, Tuple
+
+from .concurrent_executor import PROVIDER_CONCURRENCY, run_concurrently, run_coroutine_sync
+from .lazy_import import LazyModule
+from .metrics import CallRecord, get_metrics
+
+# googletrans 会带入 httpx/h2 等依赖，首次使用Google翻译时才导入
+googletrans = LazyModule("googletrans", "pip install googletrans==4.0.0rc1")
+
+GOOGLE_SERVICE = "Google翻译"
+# 每次提交给 googletrans 的列表长度；列表在同一个连接上依次翻译
+GOOGLE_BATCH_SIZE = 16
+
+
+def _resolve(result):
+    # googletrans 4.0.1 起 translate 为协程，放到常驻事件循环中执行，AsyncClient 始终绑定同一个循环
+    if inspect.isawaitable(result):
+        return run_coroutine_sync(result)
+    return result
+
+
+class GoogleTranslatorPool:
+    """复用 googletrans.Translator 实例（及其HTTP客户端和token状态）的线程安全池。
+
+    Translator 本身不是线程安全的，每个实例同一时间只借给一个线程；
+    实例数不超过 size，调用出错的实例被丢弃，下次按需重建。
+    """
+
+    def __init__(self, size: int = PROVIDER_CONCURRENCY[GOOGLE_SERVICE]):
+        self.size = max(1, size)
+        self._idle: List["googletrans.Translator"] = []
+        self._created = 0
+        self._condition = threading.Condition()
+
+    def _checkout(self) -> "googletrans.Translator":
+        with self._condition:
+            while not self._idle and self._created >= self.size:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return googletrans.Translator()
+        except Exception:
+            self._discard()
+            raise
+
+    def _checkin(self, translator: "googletrans.Translator"):
+        with self._condition:
+            self._idle.append(translator)
+            self._condition.notify()
+
+    def _discard(self):
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def translator(self):
+        translator = self._checkout()
+        # 每次借出视为一次调用计入指标；googletrans 不暴露收发字节
+        started = time.monotonic()
+        record = CallRecord()
+        try:
+            yield translator
+        except Exception as e:
+            record.error = e
+            self._discard()
+            raise
+        finally:
+            get_metrics().record_call({"provider": GOOGLE_SERVICE, "model": ""}, time.monotonic() - started, record)
+        self._checkin(translator)
+
+    def translate(self, text: str, dest: str) -> str:
+        with self.translator() as translator:
+            return _resolve(translator.translate(text, dest=dest)).text
+
+    def translate_batch(self, texts: Sequence[str], dest: str) -> Tuple[List[Optional[str]], List[Optional[Exception]]]:
+        """把一组文本作为列表提交；整批失败时逐条重试，单条失败不影响其它条目"""
+        try:
+            with self.translator() as translator:
+                return [item.text for item in _resolve(translator.translate(list(texts), dest=dest))], \
+                    [None] * len(texts)
+        except Exception as e:
+            print(f"[{GOOGLE_SERVICE}] batch of {len(texts)} failed, retrying one by one: {e}")
+
+        results: List[Optional[str]] = [None] * len(texts)
+        errors: List[Optional[Exception]] = [None] * len(texts)
+        for i, text in enumerate(texts):
+            try:
+                results[i] = self.translate(text, dest)
+            except Exception as e:
+                errors[i] = e
+        return results, errors
+
+    def translate_many(self, texts: Sequence[str], dest: str, max_workers: int = 1,
+                       batch_size: int = GOOGLE_BATCH_SIZE) -> Tuple[List[Optional[str]], List[Optional[Exception]]]:
+        """分批并发翻译，返回与 texts 对齐的 (results, errors)"""
+        batches = [list(range(start, min(start + batch_size, len(texts))))
+                   for start in range(0, len(texts), max(1, batch_size))]
+        responses, failures = run_concurrently(
+            lambda batch: self.translate_batch([texts[i] for i in batch], dest),
+            batches, max_workers, provider_key=GOOGLE_SERVICE,
+        )
+        results: List[Optional[str]] = [None] * len(texts)
+        errors: List[Optional[Exception]] = [None] * len(texts)
+        for batch, response, failure in zip(batches, responses, failures):
+            for position, index in enumerate(batch):
+                if failure is not None:
+                    errors[index] = failure
+                else:
+                    results[index], errors[index] = response[0][position], response[1][position]
+        return results, errors
+
+
+_pool = GoogleTranslatorPool()
+
+
+def get_google_translator_pool() -> GoogleTranslatorPool:
+    return _pool
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .lazy_import import LazyModule
+
+# 首次发请求时才导入；ComfyUI 自带 aiohttp，独立脚本环境下没有时退回线程池实现
+requests = LazyModule("requests")
+aiohttp = LazyModule("aiohttp")
+
+
+DEFAULT_POOL_SIZE = int(os.environ.get("OWLV_HTTP_POOL_SIZE", "10"))
+DEFAULT_IDLE_TIMEOUT = float(os.environ.get("OWLV_HTTP_IDLE_TIMEOUT", "300"))
+
+
+def host_key(url: str) -> str:
+    """按 scheme://host:port 划分连接池"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class SessionPool:
+    """进程内共享的 keep-alive 会话池，每个服务端主机一个 requests.Session。
+
+    pool_size 为每个主机保留的最大连接数，超过 idle_timeout 秒未使用的会话会被关闭。
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self._sessions: Dict[str, Tuple["requests.Session", float]] = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self) -> "requests.Session":
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def get(self, url: str) -> "requests.Session":
+        key = host_key(url)
+        now = time.monotonic()
+        with self._lock:
+            self._close_idle_locked(now, keep=key)
+            item = self._sessions.get(key)
+            session = item[0] if item else self._create_session()
+            self._sessions[key] = (session, now)
+            return session
+
+    def _close_idle_locked(self, now: float, keep: Optional[str] = None):
+        if not self.idle_timeout:
+            return
+        for key, (session, last_used) in list(self._sessions.items()):
+            if key != keep and now - last_used > self.idle_timeout:
+                session.close()
+                del self._sessions[key]
+
+    def close_idle(self):
+        with self._lock:
+            self._close_idle_locked(time.monotonic())
+
+    def close_all(self):
+        with self._lock:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def configure(self, pool_size: Optional[int] = None, idle_timeout: Optional[float] = None):
+        """修改池参数；连接池大小变化时关闭已有会话，下次请求按新参数重建"""
+        with self._lock:
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+            if pool_size is not None and pool_size != self.pool_size:
+                self.pool_size = pool_size
+                for session, _ in self._sessions.values():
+                    session.close()
+                self._sessions.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+_pool = SessionPool()
+
+
+def get_session_pool() -> SessionPool:
+    return _pool
+
+
+def get_session(url: str) -> "requests.Session":
+    """返回目标主机的共享会话"""
+    return _pool.get(url)
+
+
+# 事件循环 -> {host: aiohttp.ClientSession}；aiohttp 会话绑定创建它的事件循环
+_async_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, object]]" = weakref.WeakKeyDictionary()
+_async_lock = threading.Lock()
+
+
+def get_async_session(url: str):
+    """返回当前事件循环中目标主机的共享 aiohttp 会话（需在协程内调用）"""
+    if not aiohttp.available():
+        raise RuntimeError("aiohttp is not installed")
+    loop = asyncio.get_running_loop()
+    key = host_key(url)
+    with _async_lock:
+        sessions = _async_sessions.setdefault(loop, {})
+        session = sessions.get(key)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=_pool.pool_size, keepalive_timeout=_pool.idle_timeout)
+            session = aiohttp.ClientSession(connector=connector)
+            sessions[key] = session
+        return session
+
+
+async def close_async_sessions():
+    """关闭当前事件循环中的全部 aiohttp 会话"""
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        sessions = _async_sessions.pop(loop, {})
+    for session in sessions.values():
+        await session.close()
@@ -0,0 +1,47 @@
+import importlib
+import importlib.util
+import threading
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule:
+    """第一次访问属性时才导入的模块代理。
+
+    ComfyUI 启动时会导入所有插件，requests、googletrans 等较重的依赖推迟到真正发请求时再加载，
+    节点注册不必为用不到的服务付出导入开销。
+    """
+
+    def __init__(self, name: str, install_hint: str = ""):
+        self._name = name
+        self._install_hint = install_hint
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    try:
+                        self._module = importlib.import_module(self._name)
+                    except ImportError as e:
+                        if self._install_hint:
+                            raise ImportError(f"{self._name} is not installed ({self._install_hint})") from e
+                        raise
+        return self._module
+
+    def available(self) -> bool:
+        """模块是否可用；只查找而不导入"""
+        if self._module is not None:
+            return True
+        try:
+            return importlib.util.find_spec(self._name) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
@@ -0,0 +1,66 @@
+import traceback
+from typing import List, Tuple
+
+from .concurrent_executor import DEFAULT_MAX_WORKERS, MAX_WORKERS_LIMIT, list_input, scalar_input
+from .llm_client import DEFAULT_BATCH_SIZE
+
+
+class LLMBatchTranslatorNode:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "llm": ("LLM", {}),
+                "text": ("STRING", {"multiline": True, "default": ""}),
+                "target_language": (["英语", "中文", "日语", "韩语", "法语", "德语", "西班牙语", "意大利语", "俄语", "葡萄牙语"], {"default": "英语"}),
+            },
+            "optional": {
+                "system_prompt": ("STRING", {"multiline": True, "default": "You are a translation engine. Only output the translated text."}),
+                "split_lines": ("BOOLEAN", {"default": True}),
+                "batch_size": ("INT", {"default": DEFAULT_BATCH_SIZE, "min": 1, "max": 200}),
+                "use_cache": ("BOOLEAN", {"default": True}),
+                "max_workers": ("INT", {"default": DEFAULT_MAX_WORKERS, "min": 1, "max": MAX_WORKERS_LIMIT}),
+                "deterministic": ("BOOLEAN", {"default": True}),
+                # 0 表示按原文长度自动估算
+                "max_tokens": ("INT", {"default": 0, "min": 0, "max": 32768, "step": 64}),
+            }
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("translated_list", "translated_text")
+    OUTPUT_IS_LIST = (True, False)
+    FUNCTION = "translate"
+    CATEGORY = "Text Processing/LLM"
+
+    def translate(self, llm, text, target_language, system_prompt=None, split_lines=None,
+                  batch_size=None, use_cache=None, max_workers=None, deterministic=None,
+                  max_tokens=None) -> Tuple[List[str], str]:
+        llm = scalar_input(llm)
+        target_language = scalar_input(target_language, "英语")
+        system_prompt = scalar_input(system_prompt, "")
+        split_lines = scalar_input(split_lines, True)
+        batch_size = scalar_input(batch_size, DEFAULT_BATCH_SIZE)
+        use_cache = scalar_input(use_cache, True)
+        max_workers = scalar_input(max_workers, DEFAULT_MAX_WORKERS)
+        deterministic = scalar_input(deterministic, True)
+        max_tokens = scalar_input(max_tokens, 0) or None
+
+        # 列表输入逐项展开；开启 split_lines 时每行视为一条
+        texts = []
+        for item in list_input(text):
+            item = item or ""
+            texts.extend(item.split("\n") if split_lines else [item])
+        if not any(t.strip() for t in texts):
+            return ([""] * len(texts) or [""], "")
+
+        try:
+            results = llm.translate_batch(texts, target_language, system_prompt=system_prompt,
+                                          batch_size=batch_size, use_cache=use_cache,
+                                          max_workers=max_workers, deterministic=deterministic,
+                                          max_tokens=max_tokens)
+        except Exception as e:
+            print("LLMBatchTranslatorNode error:", e)
+            print(traceback.format_exc())
+            results = [f"LLM 翻译失败: {e}" if t.strip() else "" for t in texts]
+        return (results, "\n".join(results))
@@ -1,49 +1,174 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import re
 import traceback
 
+from .concurrent_executor import DEFAULT_MAX_WORKERS, run_concurrently
+from .generation_planner import (MAX_OUTPUT_RATIO, OUTPUT_OVERHEAD_TOKENS, generation_key, is_reasoning_model,
+                                 plan_generation)
+from .text_chunker import TextChunk, join_chunks, split_text
+from .token_utils import estimate_tokens
+from .translation_cache import cache_enabled, cache_lookup, cache_store, cached_translate, make_cache_key
+
+
+LANGUAGE_NAMES = {
+    "英语": "English",
+    "中文": "Chinese",
+    "日语": "Japanese",
+    "韩语": "Korean",
+    "法语": "French",
+    "德语": "German",
+    "西班牙语": "Spanish",
+    "意大利语": "Italian",
+    "俄语": "Russian",
+    "葡萄牙语": "Portuguese",
+}
+
+DEFAULT_SYSTEM_PROMPT = "You are a translation engine. Only output the translated text."
+DEFAULT_BATCH_SIZE = 50
+# 长文本按该token预算分段翻译（还会受模型最大输出长度限制）
+DEFAULT_CHUNK_TOKENS = 1200
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+
 
 class LLMClient:
     """轻量LLM客户端。
 
     kind: local | service | ollama
-    config: 保存与调用所需的最小配置信息
+    config: 保存与调用所需的最小配置信息；各类型均通过 config["connector"]（服务连接器或本地模型）执行翻译
     """
 
     def __init__(self, kind: str, config: Dict[str, Any]):
         self.kind = kind
         self.config = config or {}
 
-    def translate(self, text: str, target_language: str, system_prompt: str = "") -> str:
-        """翻译文本到目标语言"""
+    def fingerprint(self) -> str:
+        """返回不含密钥的状态标识"""
+        connector = self.config.get("connector")
+        if connector is not None:
+            state = connector.get_state()
+        else:
+            state = "|".join(
+                f"{k}={v}" for k, v in sorted(self.config.items())
+                if k not in ("api_key", "connector") and isinstance(v, (str, int, float, bool))
+            )
+        return f"{self.kind}|{self.config.get('provider', '')}|{state}"
+
+    def stats_key(self) -> str:
+        """滚动统计使用的键：有connector时为其 get_state()"""
+        connector = self.config.get("connector")
+        return connector.get_state() if connector is not None else self.fingerprint()
+
+    def _has_connector(self) -> bool:
+        return self.kind in ("service", "ollama", "local") and self.config.get("connector") is not None
+
+    def _target_language_name(self, target_language: str) -> str:
+        return LANGUAGE_NAMES.get(target_language, target_language)
+
+    def _system_prompt(self, system_prompt: str = "") -> str:
+        # 使用system_prompt（优先使用传入的，否则使用config中的）
+        return system_prompt or self.config.get("system_prompt") or DEFAULT_SYSTEM_PROMPT
+
+    def _cache_engine(self) -> str:
+        return self.config.get("provider") or self.kind
+
+    def _build_messages(self, text: str, target_lang: str, sys_prompt: str, context: str = "") -> List[Dict[str, str]]:
+        """构建翻译指令的messages；context 为前文，仅用于保持术语与语气一致"""
+        instruction = f"Translate the following text to {target_lang}. Keep the meaning and style."
+        if context:
+            instruction += (f"\n\nThe text continues from this passage, given for context only "
+                            f"(do not translate or repeat it):\n{context}")
+        return [
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": f"{instruction}\n\n{text}"}
+        ]
+
+    def _chunk_budget(self, chunk_tokens: Optional[int] = None) -> int:
+        """每段的输入token预算：不超过设定值，且译文不会超出模型的最大输出长度"""
+        budget = int(chunk_tokens or self.config.get("chunk_tokens") or DEFAULT_CHUNK_TOKENS)
+        return max(1, min(budget, int((self._max_output_tokens() - OUTPUT_OVERHEAD_TOKENS) / MAX_OUTPUT_RATIO)))
+
+    def _max_output_tokens(self) -> int:
+        return getattr(self.config.get("connector"), "max_output_tokens", DEFAULT_MAX_OUTPUT_TOKENS)
+
+    def _generation_params(self, text: str, target_lang: str, generation: Dict[str, Any]) -> Dict[str, Any]:
+        """按原文长度规划 max_tokens 等生成参数，generation 中显式给出的值优先"""
+        connector = self.config.get("connector")
+        model = getattr(connector, "model", None) or getattr(connector, "model_path", "")
+        return plan_generation(text, target_lang, self._max_output_tokens(),
+                               reasoning=is_reasoning_model(model), **generation)
+
+    def _cache_model(self, params: Dict[str, Any], generation: Dict[str, Any]) -> str:
+        """缓存键中的模型部分：连接器状态加上影响译文的生成参数。
+        规划出的 max_tokens 由原文决定，只有在 generation 中显式给出时才计入"""
+        settings = {key: value for key, value in params.items() if key != "max_tokens"}
+        if generation.get("max_tokens") is not None:
+            settings["max_tokens"] = params.get("max_tokens")
+        return f"{self.config['connector'].get_state()}|{generation_key(settings)}"
+
+    def _chunk_request(self, chunk: TextChunk, target_lang: str, sys_prompt: str, generation: Dict[str, Any]):
+        """返回一段文本的 (messages, 调用参数, 缓存用的提示词, 缓存用的模型标识)"""
+        messages = self._build_messages(chunk.body, target_lang, sys_prompt, chunk.context)
+        # 上下文会影响译文，需要参与缓存键
+        cache_prompt = f"{sys_prompt}\n[context]{chunk.context}" if chunk.context else sys_prompt
+        params = self._generation_params(chunk.body, target_lang, generation)
+        return messages, params, cache_prompt, self._cache_model(params, generation)
+
+    def _translate_chunk(self, chunk: TextChunk, target_lang: str, sys_prompt: str, use_cache: bool,
+                         generation: Dict[str, Any], stream: bool = False, on_chunk=None) -> str:
+        if not chunk.body:
+            return ""
+        connector = self.config["connector"]
+        messages, kwargs, cache_prompt, cache_model = self._chunk_request(chunk, target_lang, sys_prompt, generation)
+        # 调用真实API（命中缓存时跳过网络请求）
+        return cached_translate(
+            self._cache_engine(),
+            cache_model,
+            target_lang,
+            cache_prompt,
+            chunk.body,
+            (lambda: connector.invoke_stream(messages, on_chunk=on_chunk, **kwargs)) if stream
+            else (lambda: connector.invoke(messages, **kwargs)),
+            use_cache=use_cache,
+        )
+
+    def translate(self, text: str, target_language: str, system_prompt: str = "", use_cache: bool = True,
+                  stream: bool = False, on_chunk=None, chunk_tokens: Optional[int] = None,
+                  context_tokens: int = 0, **generation) -> str:
+        """翻译文本到目标语言（service类型会先查询持久化缓存）
+
+        超过 chunk_tokens 的长文本按段落/句子边界分段并发翻译后按原顺序拼接；
+        context_tokens > 0 时每段附带上一段末尾的原文作为上下文。
+        generation 为传给 plan_generation 的生成参数（deterministic、max_tokens、temperature 等）。
+        stream=True 时以SSE流式接收结果（分段按顺序进行），每段增量文本回调 on_chunk(delta, text_so_far)。
+        """
         
         # Service类型：使用真实的API connector
-        if self.kind == "service" and self.config.get("connector"):
+        if self._has_connector():
             try:
-                # 构建翻译指令的messages
-                lang_map = {
-                    "英语": "English",
-                    "中文": "Chinese",
-                    "日语": "Japanese",
-                    "韩语": "Korean",
-                    "法语": "French",
-                    "德语": "German",
-                    "西班牙语": "Spanish",
-                    "意大利语": "Italian",
-                    "俄语": "Russian",
-                    "葡萄牙语": "Portuguese",
-                }
-                target_lang = lang_map.get(target_language, target_language)
-                
-                # 使用system_prompt（优先使用传入的，否则使用config中的）
-                sys_prompt = system_prompt or self.config.get("system_prompt") or "You are a translation engine. Only output the translated text."
-                
-                messages = [
-                    {"role": "system", "content": sys_prompt},
-                    {"role": "user", "content": f"Translate the following text to {target_lang}. Keep the meaning and style.\n\n{text}"}
-                ]
-                
-                # 调用真实API
-                return self.config["connector"].invoke(messages)
+                target_lang = self._target_language_name(target_language)
+                sys_prompt = self._system_prompt(system_prompt)
+                chunks = split_text(text, self._chunk_budget(chunk_tokens), context_tokens)
+
+                if stream:
+                    translations = []
+                    for chunk in chunks:
+                        done = join_chunks(chunks[:len(translations)], translations) + chunk.prefix
+                        callback = None
+                        if on_chunk is not None:
+                            callback = lambda delta, so_far, done=done: on_chunk(delta, done + so_far)
+                        translations.append(self._translate_chunk(chunk, target_lang, sys_prompt, use_cache,
+                                                                  generation, stream=True, on_chunk=callback))
+                else:
+                    translations, errors = run_concurrently(
+                        lambda chunk: self._translate_chunk(chunk, target_lang, sys_prompt, use_cache, generation),
+                        chunks, DEFAULT_MAX_WORKERS,
+                    )
+                    for error in errors:
+                        if error is not None:
+                            raise error
+                return join_chunks(chunks, translations)
                 
             except Exception as e:
                 error_msg = f"LLM API调用失败: {str(e)}"
@@ -51,18 +176,16 @@ class LLMClient:
                 print(traceback.format_exc())
                 return error_msg
         
-        # Ollama类型：占位实现（可扩展为实际调用）
+        # Ollama类型：连接器创建失败时没有 connector
         elif self.kind == "ollama":
-            # TODO: 实现Ollama API调用
             host = self.config.get("host", "localhost:11434")
             model = self.config.get("model", "unknown")
-            return f"[Ollama {host}/{model}] -> {target_language}: {text}"
+            return f"LLM API调用失败: Ollama {host}/{model} 未连接 ({self.config.get('error', 'no connector')})"
         
-        # Local类型：占位实现（可扩展为实际模型加载）
+        # Local类型：模型加载失败时没有 connector
         elif self.kind == "local":
-            # TODO: 实现本地模型加载与推理
             path = self.config.get("path", "unknown")
-            return f"[Local {path}] -> {target_language}: {text}"
+            return f"LLM API调用失败: 本地模型 {path} 未加载 ({self.config.get('error', 'no model')})"
         
         # 未知类型或无connector：返回占位结果
         else:
@@ -70,5 +193,174 @@ class LLMClient:
             model = self.config.get("model") or self.config.get("path") or self.config.get("host") or "unknown"
             return f"[LLM {provider}/{model}] -> {target_language}: {text}"
 
+    async def _translate_chunk_async(self, chunk: TextChunk, target_lang: str, sys_prompt: str,
+                                     use_cache: bool, generation: Dict[str, Any]) -> str:
+        if not chunk.body:
+            return ""
+        connector = self.config["connector"]
+        messages, kwargs, cache_prompt, cache_model = self._chunk_request(chunk, target_lang, sys_prompt, generation)
+        key = None
+        if use_cache and cache_enabled():
+            key = make_cache_key(self._cache_engine(), cache_model, target_lang, cache_prompt, chunk.body)
+            cached = cache_lookup(key, self._cache_engine())
+            if cached is not None:
+                return cached
+
+        result = await connector.invoke_async(messages, **kwargs)
+        if key is not None:
+            cache_store(key, result)
+        return result
+
+    async def translate_async(self, text: str, target_language: str, system_prompt: str = "",
+                              use_cache: bool = True, chunk_tokens: Optional[int] = None,
+                              context_tokens: int = 0, **generation) -> str:
+        """translate 的异步版本：service类型走 connector.invoke_async，其它类型在线程中执行"""
+        if not self._has_connector():
+            return await asyncio.to_thread(self.translate, text, target_language, system_prompt, use_cache,
+                                           chunk_tokens=chunk_tokens, context_tokens=context_tokens, **generation)
+
+        try:
+            target_lang = self._target_language_name(target_language)
+            sys_prompt = self._system_prompt(system_prompt)
+            chunks = split_text(text, self._chunk_budget(chunk_tokens), context_tokens)
+            translations = await asyncio.gather(
+                *(self._translate_chunk_async(chunk, target_lang, sys_prompt, use_cache, generation)
+                  for chunk in chunks)
+            )
+            return join_chunks(chunks, translations)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error_msg = f"LLM API调用失败: {str(e)}"
+            print(error_msg)
+            print(traceback.format_exc())
+            return error_msg
+
+    def translate_batch(self, texts: List[str], target_language: str, system_prompt: str = "",
+                        batch_size: int = DEFAULT_BATCH_SIZE, use_cache: bool = True,
+                        max_workers: int = 1, **generation) -> List[str]:
+        """批量翻译：把多条文本打包进一次请求，按JSON数组约定返回并逐条对齐。
+
+        解析失败或缺失的条目会退回到单条 translate() 调用；max_workers > 1 时多个批次并发发送。
+        """
+        results: List[Optional[str]] = [None if text and text.strip() else "" for text in texts]
+        if not self._has_connector():
+            pending = [i for i, r in enumerate(results) if r is None]
+            translated = self.translate_many([texts[i] for i in pending], target_language, system_prompt,
+                                             use_cache, max_workers, **generation)
+            for i, item in zip(pending, translated):
+                results[i] = item
+            return results
+
+        target_lang = self._target_language_name(target_language)
+        sys_prompt = self._system_prompt(system_prompt)
+        caching = use_cache and cache_enabled()
+        keys: Dict[int, str] = {}
+
+        # 先从缓存取结果，只把未命中的条目发给模型；超出分段预算的长文本单独分段翻译
+        pending, retry = [], []
+        budget = self._chunk_budget()
+        for i, text in enumerate(texts):
+            if results[i] is not None:
+                continue
+            if estimate_tokens(text) > budget:
+                retry.append(i)
+                continue
+            if caching:
+                # 与单条翻译使用相同的键，两条路径共享缓存
+                cache_model = self._cache_model(self._generation_params(text, target_lang, generation), generation)
+                keys[i] = make_cache_key(self._cache_engine(), cache_model, target_lang, sys_prompt, text)
+                cached = cache_lookup(keys[i], self._cache_engine())
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            pending.append(i)
+
+        # 每批最多 batch_size 条，且总长度不超过分段预算，避免译文被 max_tokens 截断
+        batch_size = max(1, int(batch_size or 1))
+        groups, group_tokens = [], 0
+        for i in pending:
+            tokens = estimate_tokens(texts[i])
+            if not groups or len(groups[-1]) >= batch_size or group_tokens + tokens > budget:
+                groups.append([])
+                group_tokens = 0
+            groups[-1].append(i)
+            group_tokens += tokens
+        packed, _ = run_concurrently(
+            lambda group: self._invoke_packed([texts[i] for i in group], target_lang, sys_prompt, generation),
+            groups, max_workers, provider_key=self.fingerprint(),
+        )
+        for group, translated in zip(groups, packed):
+            for i, item in zip(group, translated or [None] * len(group)):
+                if item is None:
+                    retry.append(i)
+                    continue
+                results[i] = item
+                if caching:
+                    cache_store(keys[i], item)
+
+        # 解析失败的条目单独重试
+        translated = self.translate_many([texts[i] for i in retry], target_language, system_prompt,
+                                         use_cache, max_workers, **generation)
+        for i, item in zip(retry, translated):
+            results[i] = item
+        return results
+
+    def translate_many(self, texts: List[str], target_language: str, system_prompt: str = "",
+                       use_cache: bool = True, max_workers: int = DEFAULT_MAX_WORKERS,
+                       chunk_tokens: Optional[int] = None, context_tokens: int = 0, **generation) -> List[str]:
+        """逐条并发翻译，结果保持输入顺序，单条失败返回错误信息而不中断整个列表"""
+        results, errors = run_concurrently(
+            lambda text: self.translate(text, target_language, system_prompt, use_cache,
+                                        chunk_tokens=chunk_tokens, context_tokens=context_tokens, **generation),
+            texts, max_workers, provider_key=self.fingerprint(),
+        )
+        return [f"LLM 翻译失败: {e}" if e is not None else r for r, e in zip(results, errors)]
+
+    def _invoke_packed(self, texts: List[str], target_lang: str, sys_prompt: str,
+                       generation: Optional[Dict[str, Any]] = None) -> List[Optional[str]]:
+        """发送一次打包请求，返回与输入对齐的结果（无法解析的条目为None）"""
+        if len(texts) == 1:
+            return [None]
+        instruction = (
+            f"Translate each string in the following JSON array to {target_lang}. Keep the meaning and style. "
+            f"Return ONLY a JSON array of exactly {len(texts)} strings, in the same order, without any explanation."
+        )
+        packed = json.dumps(texts, ensure_ascii=False)
+        messages = [
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": f"{instruction}\n\n{packed}"},
+        ]
+        # 输出长度随批量增长，避免被默认的 max_tokens 截断
+        kwargs = self._generation_params(packed, target_lang, generation or {})
+        try:
+            content = self.config["connector"].invoke(messages, **kwargs)
+        except Exception as e:
+            print("LLM 批量翻译请求失败，退回逐条翻译:", e)
+            return [None] * len(texts)
+        return parse_packed_output(content, len(texts))
+
 
+def parse_packed_output(content: str, count: int) -> List[Optional[str]]:
+    """解析模型返回的JSON数组（兼容```json代码块与编号列表），数量不符时整体视为失败"""
+    if not isinstance(content, str):
+        return [None] * count
+    # 从每个 "[" 处尝试解析一个完整的JSON数组，取第一个条数相符的；
+    # 贪婪的正则会把数组前后说明文字中的方括号一并截进来
+    decoder = json.JSONDecoder()
+    start = content.find("[")
+    while start != -1:
+        try:
+            items, _ = decoder.raw_decode(content, start)
+        except ValueError:
+            items = None
+        if isinstance(items, list) and len(items) == count:
+            return [item.strip() if isinstance(item, str) and item.strip() else None for item in items]
+        start = content.find("[", start + 1)
+    # 兼容 "1. xxx" 形式的编号输出
+    numbered = re.findall(r"^\s*(\d+)[.)、:]\s*(.+?)\s*$", content, re.M)
+    if len(numbered) == count and [int(n) for n, _ in numbered] == list(range(1, count + 1)):
+        return [text for _, text in numbered]
+    return [None] * count
 
@@ -1,50 +1,453 @@
-import requests
+import asyncio
+import json
+import threading
+import time
+
+from .adaptive_concurrency import OUTCOME_IGNORE, OUTCOME_OVERLOAD, OUTCOME_SUCCESS, get_controller
+from .generation_planner import is_openai_reasoning_model
+from .http_pool import aiohttp, get_async_session, get_session, requests
+from .metrics import CallRecord, get_metrics, state_labels
+from .provider_stats import get_stats_store
+from .rate_limiter import get_rate_limiter
+from .retry_policy import RETRYABLE_STATUS_CODES, RetryableError, RetryPolicy, parse_retry_after
+from .token_utils import estimate_tokens
+
+
+# 表示输出因达到 max_tokens 而被截断的结束原因：OpenAI兼容接口与通义千问为 length，Claude 为 max_tokens，Gemini 为 MAX_TOKENS
+TRUNCATED_FINISH_REASONS = {"length", "max_tokens", "MAX_TOKENS"}
+
+
+class TruncatedOutputError(Exception):
+    """输出达到 max_tokens 被截断；作为失败处理，截断的译文不会写入缓存"""
 
 
 class GeneralLLMServiceConnector:
     """通用LLM服务连接器基类"""
+
+    # 用于限流配额等按服务商区分的设置
+    provider = "General"
+    # 单次请求允许的最大输出token数，长文本分段时据此确定每段长度
+    max_output_tokens = 4096
     
     def __init__(self, api_url, api_token, model, timeout=30):
         self.api_url = api_url
         self.api_token = api_token
         self.model = model
         self.timeout = timeout
+        self.retry_policy = RetryPolicy()
+        # 连接器节点上的 (rpm_limit, tpm_limit)，None 或 -1 表示使用服务商默认配额，见 rate_limiter.resolve_rate_limit
+        self.rate_limits = None
+        self._local = threading.local()
+
+    @property
+    def last_call_stats(self):
+        """当前线程最近一次调用的统计信息（首token延迟、token速率等）"""
+        return getattr(self._local, "stats", {})
+
+    @last_call_stats.setter
+    def last_call_stats(self, stats):
+        self._local.stats = stats
 
     def generate_payload(self, messages, **kwargs):
         """生成请求载荷，子类可重写以自定义参数"""
-        return {
+        payload = {
             "model": self.model,
             "messages": messages,
             "stream": False,
             "response_format": {"type": "text"},
         }
+        # OpenAI兼容接口：只转发调用方显式给出的生成参数，其余使用服务端默认值
+        if is_openai_reasoning_model(self.model):
+            # o系列只接受 max_completion_tokens，且不支持修改采样参数
+            if kwargs.get("max_tokens") is not None:
+                payload["max_completion_tokens"] = kwargs["max_tokens"]
+            return payload
+        for key in ("max_tokens", "temperature", "top_p", "frequency_penalty"):
+            if kwargs.get(key) is not None:
+                payload[key] = kwargs[key]
+        return payload
+
+    def build_headers(self):
+        """生成请求头，子类可重写以使用不同的鉴权方式"""
+        return {
+            "Authorization": f"Bearer {self.api_token}",
+            "Content-Type": "application/json"
+        }
+
+    def parse_response(self, response_data):
+        """从响应JSON中提取文本，子类可重写以适配不同的响应格式"""
+        try:
+            return response_data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError):
+            raise ValueError("Unexpected response format: missing 'content'.")
+
+    def finish_reason(self, response_data):
+        """响应（或流式事件）的结束原因，子类可重写"""
+        try:
+            return response_data["choices"][0].get("finish_reason")
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return None
+
+    def check_truncated(self, response_data):
+        if self.finish_reason(response_data) in TRUNCATED_FINISH_REASONS:
+            raise TruncatedOutputError("Response truncated: output reached max_tokens.")
+
+    def parse_usage(self, response_data):
+        """从响应（或流式事件）的 usage 字段取出 {"prompt", "completion"} token数，子类可重写。
+
+        OpenAI兼容接口为 prompt_tokens/completion_tokens，Claude 与通义千问为 input_tokens/output_tokens。
+        """
+        usage = response_data.get("usage") if isinstance(response_data, dict) else None
+        if not isinstance(usage, dict):
+            return None
+        return {
+            "prompt": usage.get("prompt_tokens", usage.get("input_tokens")),
+            "completion": usage.get("completion_tokens", usage.get("output_tokens")),
+        }
+
+    def post(self, payload, headers, stream=False):
+        """通过共享的 keep-alive 会话发送请求"""
+        url = self.stream_url() if stream else self.api_url
+        return get_session(url).post(url, json=payload, headers=headers, timeout=self.timeout, stream=stream)
+
+    def stream_url(self):
+        """流式请求的URL，子类可重写"""
+        return self.api_url
+
+    def stream_payload(self, payload):
+        """把载荷切换为流式输出，子类可重写"""
+        payload["stream"] = True
+        return payload
+
+    def stream_headers(self):
+        return self.build_headers()
+
+    def stream_event_data(self, line):
+        """从流式响应的一行中取出事件JSON文本（SSE的 data: 行），不是事件时返回None"""
+        if not line.startswith("data:"):
+            return None
+        return line[5:].strip()
+
+    def parse_stream_event(self, event):
+        """从单个SSE事件中提取增量文本，子类可重写以适配不同的流格式"""
+        try:
+            return event["choices"][0]["delta"].get("content") or ""
+        except (KeyError, IndexError, AttributeError):
+            return ""
+
+    async def post_async(self, payload, headers):
+        """通过当前事件循环共享的 aiohttp 会话发送请求，返回 (状态码, 响应头, 响应文本)"""
+        session = get_async_session(self.api_url)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with session.post(self.api_url, json=payload, headers=headers, timeout=timeout) as response:
+            return response.status, response.headers, await response.text()
+
+    def _retryable_status(self, status_code, headers, body):
+        return RetryableError(
+            f"Request failed with status code {status_code}: {body}",
+            status_code=status_code,
+            retry_after=parse_retry_after(headers.get("Retry-After")),
+        )
+
+    def rate_limit_delay(self, payload):
+        """按服务商与密钥共享的RPM/TPM配额预占额度，返回发送前需等待的秒数"""
+        limiter = get_rate_limiter(self.provider, self.api_token, self.rate_limits)
+        if limiter is None:
+            return 0.0
+        # 翻译输出长度与输入相当，按输入的两倍估算本次消耗的token
+        return limiter.reserve(2 * estimate_tokens(json.dumps(payload, ensure_ascii=False)))
+
+    def send(self, payload, headers, stream=False):
+        """发送请求：超时、连接错误与429/5xx按 retry_policy 重试，重试次数记录在 last_call_stats。
+
+        stream=True 且状态码为200时，并发名额保留到响应关闭（响应体读完）才归还，见 _hold_slot
+        """
+        waited = [0.0]
+        # 按 get_state() 区分的AIMD控制器根据延迟与过载信号调节在途请求数
+        controller = get_controller(self.get_state())
+
+        attempts = [0]
+
+        def attempt():
+            attempts[0] += 1
+            if attempts[0] > 1:
+                self.record_retry()
+            delay = self.rate_limit_delay(payload)
+            if delay > 0:
+                time.sleep(delay)
+                waited[0] += delay
+            controller.acquire()
+            started = time.monotonic()
+            outcome = OUTCOME_OVERLOAD
+            held = False
+            try:
+                try:
+                    response = self.post(payload, headers, stream=stream)
+                except requests.exceptions.Timeout:
+                    raise RetryableError(f"Request timed out after {self.timeout} seconds.")
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                    # ChunkedEncodingError：连接在响应体传输途中断开
+                    raise RetryableError(f"Request error: {str(e)}")
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    error = self._retryable_status(response.status_code, response.headers, response.text)
+                    response.close()
+                    raise error
+                outcome = OUTCOME_SUCCESS if response.status_code == 200 else OUTCOME_IGNORE
+                if stream and response.status_code == 200:
+                    self._hold_slot(response, controller, started)
+                    held = True
+                return response
+            except RetryableError:
+                raise
+            except Exception:
+                outcome = OUTCOME_IGNORE
+                raise
+            finally:
+                if not held:
+                    controller.release(time.monotonic() - started, outcome)
+
+        try:
+            response, _ = self.retry_policy.call(attempt)
+            return response
+        finally:
+            # 重试耗尽抛出异常时也更新，避免保留上一次调用的统计
+            self.last_call_stats = {"retries": max(0, attempts[0] - 1), "rate_limit_wait": waited[0],
+                                    **self._controller_stats(controller)}
+
+    @staticmethod
+    def _hold_slot(response, controller, started):
+        """流式响应占用并发名额直到响应关闭，AIMD据此看到整段生成的耗时而不只是首字节时间。
+
+        读取响应体途中连接出错时调用 response.release_slot(OUTCOME_OVERLOAD)；
+        其余情况在 close() 时按成功归还，重复调用只生效一次。
+        """
+        released = [False]
+        close = response.close
+
+        def release_slot(outcome=OUTCOME_SUCCESS):
+            if not released[0]:
+                released[0] = True
+                controller.release(time.monotonic() - started, outcome)
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release_slot()
+
+        response.release_slot = release_slot
+        response.close = close_and_release
+
+    async def send_async(self, payload, headers):
+        """send 的异步版本，返回 (状态码, 响应文本)"""
+        waited = [0.0]
+        controller = get_controller(self.get_state())
+
+        attempts = [0]
+
+        async def attempt():
+            attempts[0] += 1
+            if attempts[0] > 1:
+                self.record_retry()
+            delay = self.rate_limit_delay(payload)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                waited[0] += delay
+            await controller.acquire_async()
+            started = time.monotonic()
+            outcome = OUTCOME_OVERLOAD
+            try:
+                try:
+                    status_code, response_headers, body = await self.post_async(payload, headers)
+                except asyncio.TimeoutError:
+                    raise RetryableError(f"Request timed out after {self.timeout} seconds.")
+                except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+                    raise RetryableError(f"Request error: {str(e)}")
+                if status_code in RETRYABLE_STATUS_CODES:
+                    raise self._retryable_status(status_code, response_headers, body)
+                outcome = OUTCOME_SUCCESS if status_code == 200 else OUTCOME_IGNORE
+                return status_code, body
+            except RetryableError:
+                raise
+            except BaseException:
+                outcome = OUTCOME_IGNORE
+                raise
+            finally:
+                controller.release(time.monotonic() - started, outcome)
+
+        try:
+            (status_code, body), _ = await self.retry_policy.call_async(attempt)
+            return status_code, body
+        finally:
+            # 重试耗尽抛出异常时也更新，避免保留上一次调用的统计
+            self.last_call_stats = {"retries": max(0, attempts[0] - 1), "rate_limit_wait": waited[0],
+                                    **self._controller_stats(controller)}
+
+    @staticmethod
+    def _controller_stats(controller):
+        snapshot = controller.snapshot()
+        return {"concurrency_limit": snapshot["limit"], "latency_ewma": snapshot["latency_ewma"]}
+
+    def record_call(self, started, result, record=None):
+        """把本次调用的延迟与成败计入按 get_state() 区分的滚动统计（result为None表示失败），
+        并把 record 中的错误、收发字节与token数计入指标"""
+        ok = result is not None
+        latency = time.monotonic() - started
+        state = self.get_state()
+        get_stats_store().record(state, latency, ok, estimate_tokens(result) if ok else 0)
+        get_metrics().record_call(state_labels(self.provider, state), latency, record)
+
+    def record_retry(self):
+        get_metrics().inc("retries_total", state_labels(self.provider, self.get_state()))
+
+    def handle_response(self, status_code, body, record=None):
+        """检查状态码并解析响应，同步与异步调用共用；record 不为None时记录 usage"""
+        if status_code == 200:
+            response_data = json.loads(body)
+            if record is not None:
+                record.add_usage(self.parse_usage(response_data))
+            self.check_truncated(response_data)
+            return self.parse_response(response_data)
+        elif status_code == 401:
+            raise Exception("Unauthorized: invalid or missing API token.")
+        else:
+            raise Exception(f"Request failed with status code {status_code}: {body}")
 
     def invoke(self, messages, **kwargs):
         """调用LLM API"""
         payload = self.generate_payload(messages, **kwargs)
-        headers = {
-            "Authorization": f"Bearer {self.api_token}",
-            "Content-Type": "application/json"
-        }
+        headers = self.build_headers()
+        
+        started = time.monotonic()
+        result = None
+        record = CallRecord()
         
         try:
-            response = requests.post(self.api_url, json=payload, headers=headers, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                try:
-                    return response_data["choices"][0]["message"]["content"]
-                except KeyError:
-                    raise ValueError("Unexpected response format: missing 'content'.")
-            elif response.status_code == 401:
-                raise Exception("Unauthorized: invalid or missing API token.")
-            else:
-                raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
+            response = self.send(payload, headers)
+            record.status_code = response.status_code
+            record.request_bytes = len(response.request.body or b"")
+            record.response_bytes = len(response.content)
+            result = self.handle_response(response.status_code, response.text, record)
+            return result
                 
-        except requests.exceptions.Timeout:
+        except requests.exceptions.RequestException as e:
+            record.error = e
+            raise Exception(f"Request error: {str(e)}")
+        except Exception as e:
+            record.error = e
+            raise
+        finally:
+            self.record_call(started, result, record)
+
+    def invoke_stream(self, messages, on_chunk=None, **kwargs):
+        """以SSE流式调用LLM API，返回完整文本。
+
+        每收到一段增量文本调用 on_chunk(delta, text_so_far)，
+        并在 last_call_stats 中记录首token延迟(ttft)与每秒token数。
+        """
+        payload = self.stream_payload(self.generate_payload(messages, **kwargs))
+        headers = self.stream_headers()
+        started = time.perf_counter()
+        call_started = time.monotonic()
+        first_token_at = None
+        chunks = []
+        completed = False
+        record = CallRecord()
+
+        try:
+            with self.send(payload, headers, stream=True) as response:
+                record.status_code = response.status_code
+                record.request_bytes = len(response.request.body or b"")
+                if response.status_code != 200:
+                    self.handle_response(response.status_code, response.text)
+                response.encoding = "utf-8"
+                try:
+                    for line in response.iter_lines(decode_unicode=True):
+                        record.response_bytes += len(line.encode("utf-8")) + 1
+                        data = self.stream_event_data(line) if line else None
+                        if not data:
+                            continue
+                        if data == "[DONE]":
+                            break
+                        try:
+                            event = json.loads(data)
+                            delta = self.parse_stream_event(event)
+                        except ValueError:
+                            continue
+                        # 部分服务在最后一个（或分散在多个）事件中给出 usage
+                        record.add_usage(self.parse_usage(event))
+                        self.check_truncated(event)
+                        if not delta:
+                            continue
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        chunks.append(delta)
+                        if on_chunk is not None:
+                            on_chunk(delta, "".join(chunks))
+                except requests.exceptions.RequestException:
+                    # 响应体传输途中超时或断开，按过载信号归还并发名额
+                    response.release_slot(OUTCOME_OVERLOAD)
+                    raise
+            completed = True
+
+        except requests.exceptions.Timeout as e:
+            record.error = e
             raise Exception(f"Request timed out after {self.timeout} seconds.")
         except requests.exceptions.RequestException as e:
+            record.error = e
             raise Exception(f"Request error: {str(e)}")
+        except Exception as e:
+            record.error = e
+            raise
+        finally:
+            self.record_call(call_started, "".join(chunks) if completed else None, record)
+
+        elapsed = time.perf_counter() - started
+        # 多数服务每个增量事件约对应一个token，以事件数近似输出token数
+        generation_time = elapsed - ((first_token_at - started) if first_token_at else 0)
+        self.last_call_stats = {
+            **self.last_call_stats,
+            "ttft": (first_token_at - started) if first_token_at else None,
+            "elapsed": elapsed,
+            "chunks": len(chunks),
+            "tokens_per_second": len(chunks) / generation_time if generation_time > 0 else None,
+        }
+        return "".join(chunks)
+
+    async def invoke_async(self, messages, **kwargs):
+        """异步调用LLM API，与 invoke 共用载荷生成与响应解析逻辑"""
+        if not aiohttp.available():
+            return await asyncio.to_thread(self.invoke, messages, **kwargs)
+        payload = self.generate_payload(messages, **kwargs)
+        headers = self.build_headers()
+
+        started = time.monotonic()
+        result = None
+        cancelled = False
+        record = CallRecord()
+
+        try:
+            status_code, body = await self.send_async(payload, headers)
+            record.status_code = status_code
+            # aiohttp 与 json.dumps 默认参数序列化的请求体相同
+            record.request_bytes = len(json.dumps(payload))
+            record.response_bytes = len(body.encode("utf-8"))
+            result = self.handle_response(status_code, body, record)
+            return result
+
+        except asyncio.CancelledError:
+            # 被对冲请求取消不代表服务端失败，不计入统计
+            cancelled = True
+            raise
+        except aiohttp.ClientError as e:
+            record.error = e
+            raise Exception(f"Request error: {str(e)}")
+        except Exception as e:
+            record.error = e
+            raise
+        finally:
+            if not cancelled:
+                self.record_call(started, result, record)
 
     def get_state(self):
         """返回用于比较状态的字符串表示（不包含token以避免泄露）"""
@@ -53,6 +456,8 @@ class GeneralLLMServiceConnector:
 
 class SiliconFlowConnector(GeneralLLMServiceConnector):
     """SiliconFlow API 连接器"""
+
+    provider = "SiliconFlow"
     
     def __init__(self, api_token, model):
         super().__init__("https://api.siliconflow.cn/v1/chat/completions", api_token, model)
@@ -74,6 +479,8 @@ class SiliconFlowConnector(GeneralLLMServiceConnector):
 
 class ZhiPuConnector(GeneralLLMServiceConnector):
     """智谱AI (ZhiPu) API 连接器"""
+
+    provider = "ZhiPu"
     
     def __init__(self, api_token, model):
         super().__init__("https://open.bigmodel.cn/api/paas/v4/chat/completions", api_token, model)
@@ -94,6 +501,8 @@ class ZhiPuConnector(GeneralLLMServiceConnector):
 
 class MoonshotConnector(GeneralLLMServiceConnector):
     """Moonshot (Kimi) API 连接器"""
+
+    provider = "Moonshot"
     
     def __init__(self, api_token, model):
         super().__init__("https://api.moonshot.cn/v1/chat/completions", api_token, model)
@@ -114,6 +523,9 @@ class MoonshotConnector(GeneralLLMServiceConnector):
 
 class DeepSeekConnector(GeneralLLMServiceConnector):
     """DeepSeek API 连接器"""
+
+    provider = "DeepSeek"
+    max_output_tokens = 8192
     
     def __init__(self, api_token, model):
         super().__init__("https://api.deepseek.com/chat/completions", api_token, model)
@@ -121,12 +533,16 @@ class DeepSeekConnector(GeneralLLMServiceConnector):
 
 class OpenAIConnector(GeneralLLMServiceConnector):
     """OpenAI API 连接器"""
+
+    provider = "OpenAI"
     
     def __init__(self, api_token, model, api_base=None):
         url = api_base or "https://api.openai.com/v1/chat/completions"
         super().__init__(url, api_token, model)
 
     def generate_payload(self, messages, **kwargs):
+        if is_openai_reasoning_model(self.model):
+            return super().generate_payload(messages, **kwargs)
         return {
             "model": self.model,
             "messages": messages,
@@ -138,38 +554,27 @@ class OpenAIConnector(GeneralLLMServiceConnector):
 
 class AzureOpenAIConnector(GeneralLLMServiceConnector):
     """Azure OpenAI API 连接器"""
+
+    provider = "AzureOpenAI"
     
     def __init__(self, api_token, model, api_base):
         if not api_base:
             raise ValueError("Azure OpenAI requires api_base (endpoint URL)")
         super().__init__(api_base, api_token, model)
     
-    def invoke(self, messages, **kwargs):
+    def build_headers(self):
         """Azure使用api-key header而非Bearer token"""
-        payload = self.generate_payload(messages, **kwargs)
-        headers = {
+        return {
             "api-key": self.api_token,
             "Content-Type": "application/json"
         }
-        
-        try:
-            response = requests.post(self.api_url, json=payload, headers=headers, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                try:
-                    return response_data["choices"][0]["message"]["content"]
-                except KeyError:
-                    raise ValueError("Unexpected response format: missing 'content'.")
-            else:
-                raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
-                
-        except requests.exceptions.Timeout:
-            raise Exception(f"Request timed out after {self.timeout} seconds.")
 
 
 class QwenConnector(GeneralLLMServiceConnector):
     """通义千问 (Qwen) API 连接器"""
+
+    provider = "Qwen"
+    max_output_tokens = 8192
     
     def __init__(self, api_token, model):
         super().__init__("https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation", api_token, model)
@@ -187,36 +592,40 @@ class QwenConnector(GeneralLLMServiceConnector):
             }
         }
 
-    def invoke(self, messages, **kwargs):
+    def parse_response(self, response_data):
         """Qwen API 使用不同的响应格式"""
-        payload = self.generate_payload(messages, **kwargs)
-        headers = {
-            "Authorization": f"Bearer {self.api_token}",
-            "Content-Type": "application/json"
-        }
-        
         try:
-            response = requests.post(self.api_url, json=payload, headers=headers, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                try:
-                    return response_data["output"]["text"]
-                except KeyError:
-                    raise ValueError("Unexpected response format: missing 'output.text'.")
-            elif response.status_code == 401:
-                raise Exception("Unauthorized: invalid or missing API token.")
-            else:
-                raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
-                
-        except requests.exceptions.Timeout:
-            raise Exception(f"Request timed out after {self.timeout} seconds.")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Request error: {str(e)}")
+            return response_data["output"]["text"]
+        except KeyError:
+            raise ValueError("Unexpected response format: missing 'output.text'.")
+
+    def finish_reason(self, response_data):
+        try:
+            return response_data["output"].get("finish_reason")
+        except (KeyError, TypeError, AttributeError):
+            return None
+
+    def stream_payload(self, payload):
+        # 开启增量输出，每个事件只包含新生成的文本
+        payload["parameters"]["incremental_output"] = True
+        return payload
+
+    def stream_headers(self):
+        headers = self.build_headers()
+        headers["X-DashScope-SSE"] = "enable"
+        return headers
+
+    def parse_stream_event(self, event):
+        try:
+            return event["output"]["text"] or ""
+        except (KeyError, TypeError):
+            return ""
 
 
 class ClaudeConnector(GeneralLLMServiceConnector):
     """Anthropic Claude API 连接器"""
+
+    provider = "Claude"
     
     def __init__(self, api_token, model):
         super().__init__("https://api.anthropic.com/v1/messages", api_token, model)
@@ -230,37 +639,42 @@ class ClaudeConnector(GeneralLLMServiceConnector):
             "top_p": kwargs.get("top_p", 0.9),
         }
 
-    def invoke(self, messages, **kwargs):
+    def build_headers(self):
         """Claude API 使用不同的请求格式"""
-        payload = self.generate_payload(messages, **kwargs)
-        headers = {
+        return {
             "x-api-key": self.api_token,
             "Content-Type": "application/json",
             "anthropic-version": "2023-06-01"
         }
-        
+
+    def parse_response(self, response_data):
         try:
-            response = requests.post(self.api_url, json=payload, headers=headers, timeout=self.timeout)
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                try:
-                    return response_data["content"][0]["text"]
-                except KeyError:
-                    raise ValueError("Unexpected response format: missing 'content[0].text'.")
-            elif response.status_code == 401:
-                raise Exception("Unauthorized: invalid or missing API key.")
-            else:
-                raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
-                
-        except requests.exceptions.Timeout:
-            raise Exception(f"Request timed out after {self.timeout} seconds.")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Request error: {str(e)}")
+            return response_data["content"][0]["text"]
+        except (KeyError, IndexError):
+            raise ValueError("Unexpected response format: missing 'content[0].text'.")
+
+    def finish_reason(self, response_data):
+        # 流式响应中 stop_reason 在 message_delta 事件的 delta 里
+        if not isinstance(response_data, dict):
+            return None
+        return response_data.get("stop_reason") or (response_data.get("delta") or {}).get("stop_reason")
+
+    def parse_usage(self, response_data):
+        # 流式响应中输入token数在 message_start 事件的 message.usage 里，输出token数在 message_delta 的 usage 里
+        if isinstance(response_data, dict) and "usage" not in response_data:
+            response_data = response_data.get("message")
+        return super().parse_usage(response_data)
+
+    def parse_stream_event(self, event):
+        if event.get("type") == "content_block_delta":
+            return event.get("delta", {}).get("text") or ""
+        return ""
 
 
 class GrokConnector(GeneralLLMServiceConnector):
     """xAI Grok API 连接器"""
+
+    provider = "Grok"
     
     def __init__(self, api_token, model):
         super().__init__("https://api.x.ai/v1/chat/completions", api_token, model)
@@ -273,4 +687,101 @@ class GrokConnector(GeneralLLMServiceConnector):
             "max_tokens": kwargs.get("max_tokens", 512),
             "temperature": kwargs.get("temperature", 0.7),
             "top_p": kwargs.get("top_p", 0.9),
-        }
\ No newline at end of file
+        }
+
+
+class OllamaConnector(GeneralLLMServiceConnector):
+    """Ollama /api/chat 连接器。
+
+    keep_alive 控制模型在两次请求之间驻留显存的时长（如 "30m"，-1 表示常驻），
+    避免队列中的每个任务都重新加载模型；preload() 可提前把模型加载好。
+    """
+
+    provider = "Ollama"
+    # Ollama 默认上下文较短（num_ctx 2048），分段时按此控制每段长度
+    max_output_tokens = 2048
+
+    def __init__(self, host, model, api_token="", keep_alive="30m", timeout=300):
+        host = (host or "http://localhost:11434").strip().rstrip("/")
+        if "://" not in host:
+            host = f"http://{host}"
+        self.host = host
+        self.keep_alive = keep_alive
+        # 本地推理与冷启动加载都可能较慢，超时比云端服务更长
+        super().__init__(f"{host}/api/chat", api_token, model, timeout=timeout)
+
+    def _keep_alive(self):
+        # 纯数字按秒处理，其余（如 "30m"、"1h"）原样传给 Ollama
+        value = str(self.keep_alive).strip()
+        try:
+            return int(value)
+        except ValueError:
+            return value or "5m"
+
+    def generate_payload(self, messages, **kwargs):
+        options = {}
+        for key, option in (("max_tokens", "num_predict"), ("temperature", "temperature"),
+                            ("top_p", "top_p"), ("frequency_penalty", "frequency_penalty")):
+            if kwargs.get(key) is not None:
+                options[option] = kwargs[key]
+        return {
+            "model": self.model,
+            "messages": messages,
+            "stream": False,
+            "keep_alive": self._keep_alive(),
+            "options": options,
+        }
+
+    def build_headers(self):
+        # 本地 Ollama 无需鉴权；经反向代理访问时使用 Bearer token
+        headers = {"Content-Type": "application/json"}
+        if self.api_token:
+            headers["Authorization"] = f"Bearer {self.api_token}"
+        return headers
+
+    def parse_response(self, response_data):
+        try:
+            return response_data["message"]["content"]
+        except (KeyError, TypeError):
+            raise ValueError("Unexpected response format: missing 'message.content'.")
+
+    def finish_reason(self, response_data):
+        return response_data.get("done_reason") if isinstance(response_data, dict) else None
+
+    def parse_usage(self, response_data):
+        # Ollama 在响应（流式时为最后一个事件）中给出 prompt_eval_count/eval_count
+        if not isinstance(response_data, dict) or "eval_count" not in response_data:
+            return None
+        return {"prompt": response_data.get("prompt_eval_count"), "completion": response_data.get("eval_count")}
+
+    def stream_event_data(self, line):
+        # Ollama 以 NDJSON 流式输出，每行一个JSON对象
+        return line.strip() or None
+
+    def parse_stream_event(self, event):
+        if event.get("error"):
+            raise Exception(f"Ollama error: {event['error']}")
+        return (event.get("message") or {}).get("content") or ""
+
+    def preload(self):
+        """发送不含消息的请求，让 Ollama 把模型加载进显存并按 keep_alive 保持驻留"""
+        started = time.monotonic()
+        payload = {"model": self.model, "messages": [], "stream": False, "keep_alive": self._keep_alive()}
+        response, _ = self.retry_policy.call(lambda: self._post_preload(payload))
+        if response.status_code != 200:
+            self.handle_response(response.status_code, response.text)
+        elapsed = time.monotonic() - started
+        print(f"[OllamaConnector] model {self.model} loaded in {elapsed:.2f}s (keep_alive={self.keep_alive})")
+        return elapsed
+
+    def _post_preload(self, payload):
+        try:
+            response = self.post(payload, self.build_headers())
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            raise RetryableError(f"Request error: {str(e)}")
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise self._retryable_status(response.status_code, response.headers, response.text)
+        return response
+
+    def get_state(self):
+        return f"{self.api_url}|{self.model}"
@@ -2,7 +2,9 @@ import os
 import traceback
 from typing import Tuple
 
+from .connector_registry import get_connector_registry
 from .llm_client import LLMClient
+from .local_llm import DEFAULT_N_CTX, comfy_models_dir, find_model_file, get_local_model_registry
 
 
 class LLMLocalModelLoaderNode:
@@ -12,6 +14,13 @@ class LLMLocalModelLoaderNode:
             "required": {
                 "source": (["ComfyUI models/LLM", "自定义目录"], {"default": "ComfyUI models/LLM"}),
                 "custom_path": ("STRING", {"default": ""}),
+            },
+            "optional": {
+                # 目录下的GGUF文件名，留空时使用找到的第一个
+                "model_name": ("STRING", {"default": ""}),
+                "n_ctx": ("INT", {"default": DEFAULT_N_CTX, "min": 512, "max": 131072, "step": 512}),
+                # 0 表示按物理核心数自动设置
+                "n_threads": ("INT", {"default": 0, "min": 0, "max": 256}),
             }
         }
 
@@ -20,26 +29,34 @@ class LLMLocalModelLoaderNode:
     FUNCTION = "load"
     CATEGORY = "Text Processing/LLM"
 
-    def load(self, source: str, custom_path: str) -> Tuple[object]:
+    def load(self, source: str, custom_path: str, model_name: str = "", n_ctx: int = DEFAULT_N_CTX,
+             n_threads: int = 0) -> Tuple[object]:
+        model_dir = custom_path or ""
         try:
             if source == "自定义目录" and custom_path and custom_path.strip():
                 model_dir = custom_path.strip()
             else:
-                # 定位到 ComfyUI 根目录，再拼接 models/LLM
-                base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-                model_dir = os.path.join(base_dir, "models", "LLM")
-
-            # 仅做存在性检查
-            exists = os.path.isdir(model_dir)
-            config = {"path": model_dir, "exists": exists}
-            client = LLMClient(kind="local", config=config)
+                model_dir = os.path.join(comfy_models_dir(), "LLM")
+
+            model_path = find_model_file(model_dir, (model_name or "").strip())
+
+            def build_client():
+                # 同一模型在进程内只加载一次；客户端被淘汰回收时归还引用
+                handle = get_local_model_registry().handle(model_path, n_ctx=n_ctx, n_threads=n_threads)
+                config = {
+                    "provider": "Local",
+                    "path": model_path,
+                    "exists": True,
+                    "connector": handle,
+                }
+                return LLMClient(kind="local", config=config)
+
+            client = get_connector_registry().get_or_create("Local", model_path, "", build_client,
+                                                            options=(n_ctx, n_threads))
             return (client,)
         except Exception as e:
             print("LLMLocalModelLoaderNode error:", e)
             print(traceback.format_exc())
             # 返回一个占位对象，避免阻塞流程
-            client = LLMClient(kind="local", config={"path": custom_path or "", "error": str(e)})
+            client = LLMClient(kind="local", config={"path": model_dir, "error": str(e)})
             return (client,)
-
-
-
@@ -0,0 +1,233 @@
+import asyncio
+import random
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+
+from .concurrent_executor import run_coroutine_sync
+from .llm_client import LLMClient
+from .provider_stats import MIN_SAMPLES, get_stats_store
+from .token_utils import estimate_tokens
+from .translation_cache import is_error_text
+
+
+DEFAULT_HEDGE_PERCENTILE = 0.9
+DEFAULT_HEDGE_DELAY = 3.0
+
+# 路由策略：ordered 按输入顺序；latency 选延迟最低；cost 选最便宜；
+# auto 短文本选够快的最便宜后端，长文本选输出速率最高的后端
+ROUTING_POLICIES = ["ordered", "latency", "cost", "auto"]
+SHORT_TEXT_TOKENS = 60
+# 错误率超过该值的后端不作为首选
+MAX_ERROR_RATE = 0.2
+# 少量请求随机分给其它后端，保持统计数据新鲜
+EXPLORE_RATE = 0.05
+
+_decisions: Deque[Dict[str, Any]] = deque(maxlen=500)
+_decisions_lock = threading.Lock()
+
+
+def recent_decisions() -> List[Dict[str, Any]]:
+    """最近的路由决策记录，供审计"""
+    with _decisions_lock:
+        return list(_decisions)
+
+
+def rank_backends(clients: List[LLMClient], text: str, policy: str) -> Tuple[List[LLMClient], str]:
+    """按策略与各后端的滚动统计对候选排序，返回 (排序结果, 决策原因)。
+
+    请求数（含对冲落败被取消的请求）不足 MIN_SAMPLES 的后端轮流作为首选（请求数最少者优先）；
+    其余后端按策略排序，作为对冲与故障转移的备选。
+    """
+    if policy == "ordered" or len(clients) < 2:
+        return list(clients), "ordered"
+    store = get_stats_store()
+    stats = {id(c): store.get(c.stats_key()) for c in clients}
+    warm = [c for c in clients if stats[id(c)].attempts >= MIN_SAMPLES]
+    cold = [c for c in clients if c not in warm]
+    ranked, reason = _rank_warm(warm, text, policy, stats) if warm else ([], "")
+    if cold:
+        first = min(cold, key=lambda c: stats[id(c)].attempts)
+        attempts = stats[id(first)].attempts
+        return [first] + ranked + [c for c in cold if c is not first], \
+            f"warm-up: {first.stats_key()} has {attempts}/{MIN_SAMPLES} samples"
+    if random.random() < EXPLORE_RATE:
+        shuffled = list(clients)
+        random.shuffle(shuffled)
+        return shuffled, "explore"
+    return ranked, reason
+
+
+def _rank_warm(clients: List[LLMClient], text: str, policy: str, stats) -> Tuple[List[LLMClient], str]:
+    """按策略对已有足够样本的后端排序"""
+    store = get_stats_store()
+    healthy = [c for c in clients if stats[id(c)].error_rate <= MAX_ERROR_RATE] or list(clients)
+    rest = [c for c in clients if c not in healthy]
+
+    def p(c, percentile):
+        value = stats[id(c)].percentile(percentile)
+        return value if value is not None else float("inf")
+
+    def latency_score(c):
+        # 错误率按惩罚系数折算到延迟上
+        return p(c, 0.5) * (1 + 4 * stats[id(c)].error_rate)
+
+    def price(c):
+        p = store.price(c.stats_key())
+        return p if p is not None else float("inf")
+
+    tokens = estimate_tokens(text)
+    if policy == "latency":
+        ranked, reason = sorted(healthy, key=latency_score), "lowest p50 latency"
+    elif policy == "cost":
+        ranked, reason = sorted(healthy, key=price), "lowest token price"
+    elif tokens <= SHORT_TEXT_TOKENS:
+        # 短文本：p95 不超过最快后端1.5倍的候选中选最便宜的
+        best_p95 = min(p(c, 0.95) for c in healthy)
+        fast = [c for c in healthy if p(c, 0.95) <= best_p95 * 1.5]
+        ranked = sorted(fast, key=price) + sorted([c for c in healthy if c not in fast], key=latency_score)
+        reason = f"short text ({tokens} tokens): cheapest backend within 1.5x of best p95"
+    else:
+        ranked = sorted(healthy, key=lambda c: -(stats[id(c)].tokens_per_second or 0))
+        reason = f"long text ({tokens} tokens): highest tokens/second"
+    return ranked + rest, reason
+
+
+class RoutedLLMClient(LLMClient):
+    """在多个LLM之间对冲与故障转移的客户端。
+
+    先按路由策略（见 rank_backends）对候选排序，再向首选LLM发送请求；超过其历史延迟的指定分位数仍未返回时，向下一个LLM发出对冲请求，
+    采用最先成功的结果并取消其余请求。请求失败时立即转移到下一个LLM。
+    """
+
+    def __init__(self, clients: List[LLMClient], hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 hedge_delay: float = DEFAULT_HEDGE_DELAY, policy: str = "ordered"):
+        super().__init__(kind="router", config={"provider": "Router"})
+        self.clients = clients
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.policy = policy
+        self.last_decision: Dict[str, Any] = {}
+
+    def fingerprint(self) -> str:
+        return f"router|{self.policy}|" + "|".join(client.fingerprint() for client in self.clients)
+
+    def _hedge_after(self, client: LLMClient) -> float:
+        observed = get_stats_store().get(client.stats_key()).percentile(self.hedge_percentile)
+        return observed if observed is not None else self.hedge_delay
+
+    def _record_decision(self, text: str, ranked: List[LLMClient], reason: str, winner: str = "",
+                         hedged: List[str] = (), failed: List[Dict[str, str]] = ()):
+        decision = {
+            "time": time.time(),
+            "policy": self.policy,
+            "text_tokens": estimate_tokens(text),
+            "order": [client.stats_key() for client in ranked],
+            "reason": reason,
+            "served_by": winner,
+            "hedged": list(hedged),
+            "failed": list(failed),
+        }
+        self.last_decision = decision
+        with _decisions_lock:
+            _decisions.append(decision)
+
+    def translate(self, text: str, target_language: str, system_prompt: str = "", use_cache: bool = True,
+                  stream: bool = False, on_chunk=None, chunk_tokens=None, context_tokens: int = 0,
+                  **generation) -> str:
+        # 对冲依赖可取消的异步请求，流式参数在路由模式下不生效
+        return run_coroutine_sync(self.translate_async(text, target_language, system_prompt, use_cache,
+                                                       chunk_tokens, context_tokens, **generation))
+
+    async def translate_async(self, text: str, target_language: str, system_prompt: str = "",
+                              use_cache: bool = True, chunk_tokens=None, context_tokens: int = 0,
+                              **generation) -> str:
+        remaining, reason = rank_backends(self.clients, text, self.policy)
+        ranked = list(remaining)
+        running: Dict[asyncio.Task, Tuple[LLMClient, float]] = {}
+        last_error = "LLM API调用失败: 没有可用的LLM"
+        # 对冲与故障转移记录在决策中，不逐次打印
+        hedged: List[str] = []
+        failed: List[Dict[str, str]] = []
+
+        def launch():
+            client = remaining.pop(0)
+            task = asyncio.ensure_future(client.translate_async(text, target_language, system_prompt, use_cache,
+                                                                chunk_tokens, context_tokens, **generation))
+            running[task] = (client, time.monotonic())
+            return client
+
+        launch()
+        try:
+            while running:
+                # 还有备用LLM时，等待到当前最新请求的对冲时间点
+                newest = max(running.values(), key=lambda item: item[1])
+                timeout = None
+                if remaining:
+                    timeout = max(0.0, newest[1] + self._hedge_after(newest[0]) - time.monotonic())
+                done, _ = await asyncio.wait(list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged.append(launch().stats_key())
+                    continue
+
+                for task in done:
+                    client, started = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = f"LLM API调用失败: {e}"
+                    if not is_error_text(result):
+                        self._record_decision(text, ranked, reason, client.stats_key(), hedged, failed)
+                        return result
+                    last_error = result
+                    failed.append({"backend": client.stats_key(), "error": result})
+                if remaining:
+                    # 有请求失败时立即转移到下一个LLM，而不是等待对冲时间
+                    launch()
+            self._record_decision(text, ranked, reason, hedged=hedged, failed=failed)
+            return last_error
+        finally:
+            store = get_stats_store()
+            for task, (client, started) in running.items():
+                task.cancel()
+                # 被取消的请求不计入成败与错误率，只把已等待的时间作为延迟下限单独记录，
+                # 使总是输给对冲请求的后端也能结束预热轮换
+                if self.policy != "ordered" and store.get(client.stats_key()).attempts < MIN_SAMPLES:
+                    store.record_censored(client.stats_key(), time.monotonic() - started)
+
+
+class LLMRouterNode:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "llm_1": ("LLM", {}),
+            },
+            "optional": {
+                "llm_2": ("LLM", {}),
+                "llm_3": ("LLM", {}),
+                "llm_4": ("LLM", {}),
+                "policy": (ROUTING_POLICIES, {"default": "ordered"}),
+                "hedge_percentile": ("FLOAT", {"default": DEFAULT_HEDGE_PERCENTILE, "min": 0.5, "max": 0.99, "step": 0.01}),
+                "hedge_delay": ("FLOAT", {"default": DEFAULT_HEDGE_DELAY, "min": 0.1, "max": 60.0, "step": 0.1}),
+            }
+        }
+
+    RETURN_TYPES = ("LLM",)
+    RETURN_NAMES = ("llm",)
+    FUNCTION = "route"
+    CATEGORY = "Text Processing/LLM"
+
+    def route(self, llm_1, llm_2=None, llm_3=None, llm_4=None,
+              hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+              hedge_delay: float = DEFAULT_HEDGE_DELAY, policy: str = "ordered") -> Tuple[object]:
+        try:
+            clients = [llm for llm in (llm_1, llm_2, llm_3, llm_4) if llm is not None]
+            return (RoutedLLMClient(clients, hedge_percentile=hedge_percentile, hedge_delay=hedge_delay, policy=policy),)
+        except Exception as e:
+            print("LLMRouterNode error:", e)
+            print(traceback.format_exc())
+            return (llm_1,)
@@ -1,8 +1,10 @@
 import traceback
 from typing import Tuple
 
+from .connector_registry import get_connector_registry
 from .llm_client import LLMClient
 from .llm_connectors import GeneralLLMServiceConnector
+from .retry_policy import DEFAULT_DEADLINE, DEFAULT_MAX_RETRIES, RetryPolicy
 
 
 class GeneralLLMServiceConnectorNode:
@@ -22,6 +24,11 @@ class GeneralLLMServiceConnectorNode:
                     "default": "",
                     "placeholder": "Enter custom model name (used when model is 'Custom Model')"
                 }),
+                "max_retries": ("INT", {"default": DEFAULT_MAX_RETRIES, "min": 0, "max": 10}),
+                "retry_deadline": ("FLOAT", {"default": DEFAULT_DEADLINE, "min": 1.0, "max": 600.0, "step": 1.0}),
+                # 客户端限流：-1 使用服务商默认配额（或环境变量 OWLV_RATE_LIMIT_<服务商>），0 不限制
+                "rpm_limit": ("INT", {"default": -1, "min": -1, "max": 1000000}),
+                "tpm_limit": ("INT", {"default": -1, "min": -1, "max": 1000000000}),
             }
         }
 
@@ -30,22 +37,31 @@ class GeneralLLMServiceConnectorNode:
     FUNCTION = "connect"
     CATEGORY = "Text Processing/LLM"
 
-    def connect(self, api_url: str, api_key: str, model: str, custom_model: str = "") -> Tuple[object]:
+    def connect(self, api_url: str, api_key: str, model: str, custom_model: str = "",
+                max_retries: int = DEFAULT_MAX_RETRIES, retry_deadline: float = DEFAULT_DEADLINE,
+                rpm_limit: int = -1, tpm_limit: int = -1) -> Tuple[object]:
         try:
             # 确定最终使用的模型名称
             final_model = custom_model.strip() if model == "Custom Model" and custom_model.strip() else model
             
-            # 创建通用的OpenAI兼容连接器
-            connector = GeneralLLMServiceConnector(api_url, api_key, final_model)
-            
-            config = {
-                "provider": "General",
-                "model": final_model,
-                "api_url": api_url,
-                "api_key": api_key,
-                "connector": connector,
-            }
-            client = LLMClient(kind="service", config=config)
+            def build_client():
+                # 创建通用的OpenAI兼容连接器
+                connector = GeneralLLMServiceConnector(api_url, api_key, final_model)
+                connector.retry_policy = RetryPolicy(max_retries=max_retries, deadline=retry_deadline)
+                connector.rate_limits = (rpm_limit, tpm_limit)
+                
+                config = {
+                    "provider": "General",
+                    "model": final_model,
+                    "api_url": api_url,
+                    "api_key": api_key,
+                    "connector": connector,
+                }
+                return LLMClient(kind="service", config=config)
+
+            # 输入不变时复用已登记的客户端，保留其连接与运行状态
+            client = get_connector_registry().get_or_create("General", final_model, api_key, build_client, api_url=api_url,
+                                                            options=(max_retries, retry_deadline, rpm_limit, tpm_limit))
             return (client,)
             
         except Exception as e:
@@ -1,5 +1,23 @@
 import traceback
-from typing import Tuple
+from typing import List, Tuple
+
+from .concurrent_executor import DEFAULT_MAX_WORKERS, MAX_WORKERS_LIMIT, list_input, scalar_input
+from .llm_client import DEFAULT_CHUNK_TOKENS
+
+
+def _progress_callback(text: str):
+    """流式输出时通过 ComfyUI 的进度条报告进度（按源文本长度估算总量）"""
+    try:
+        from comfy.utils import ProgressBar
+    except ImportError:
+        return None
+    total = max(1, len(text))
+    progress = ProgressBar(total)
+
+    def on_chunk(delta, text_so_far):
+        progress.update_absolute(min(len(text_so_far), total), total)
+
+    return on_chunk
 
 
 class LLMTranslatorNode:
@@ -13,24 +31,70 @@ class LLMTranslatorNode:
             },
             "optional": {
                 "system_prompt": ("STRING", {"multiline": True, "default": "You are a translation engine. Only output the translated text."}),
+                "use_cache": ("BOOLEAN", {"default": True}),
+                "max_workers": ("INT", {"default": DEFAULT_MAX_WORKERS, "min": 1, "max": MAX_WORKERS_LIMIT}),
+                "stream": ("BOOLEAN", {"default": False}),
+                "chunk_tokens": ("INT", {"default": DEFAULT_CHUNK_TOKENS, "min": 64, "max": 16384, "step": 64}),
+                "context_tokens": ("INT", {"default": 0, "min": 0, "max": 2048, "step": 32}),
+                "deterministic": ("BOOLEAN", {"default": True}),
+                # 0 表示按原文长度自动估算
+                "max_tokens": ("INT", {"default": 0, "min": 0, "max": 32768, "step": 64}),
             }
         }
 
+    # 列表输入在节点内部并发翻译，而不是由 ComfyUI 逐条串行调用
+    INPUT_IS_LIST = True
     RETURN_TYPES = ("STRING",)
     RETURN_NAMES = ("translated_text",)
+    OUTPUT_IS_LIST = (True,)
     FUNCTION = "translate"
     CATEGORY = "Text Processing/LLM"
 
-    def translate(self, llm, text: str, target_language: str, system_prompt: str = "") -> Tuple[str]:
-        if not text or not text.strip():
-            return ("",)
+    def translate(self, llm, text, target_language, system_prompt=None, use_cache=None,
+                  max_workers=None, stream=None, chunk_tokens=None, context_tokens=None,
+                  deterministic=None, max_tokens=None) -> Tuple[List[str]]:
+        llm = scalar_input(llm)
+        target_language = scalar_input(target_language, "英语")
+        system_prompt = scalar_input(system_prompt, "")
+        use_cache = scalar_input(use_cache, True)
+        max_workers = scalar_input(max_workers, DEFAULT_MAX_WORKERS)
+        stream = scalar_input(stream, False)
+        chunking = {
+            "chunk_tokens": scalar_input(chunk_tokens, DEFAULT_CHUNK_TOKENS),
+            "context_tokens": scalar_input(context_tokens, 0),
+            "deterministic": scalar_input(deterministic, True),
+            "max_tokens": scalar_input(max_tokens, 0) or None,
+        }
+        texts = list_input(text)
 
+        if len(texts) == 1:
+            return ([self._translate_one(llm, texts[0], target_language, system_prompt, use_cache, stream,
+                                         **chunking)],)
         try:
-            result = llm.translate(text=text, target_language=target_language, system_prompt=system_prompt)
-            return (result,)
+            pending = [i for i, t in enumerate(texts) if t and t.strip()]
+            results = [""] * len(texts)
+            translated = llm.translate_many([texts[i] for i in pending], target_language, system_prompt,
+                                            use_cache=use_cache, max_workers=max_workers, **chunking)
+            for i, item in zip(pending, translated):
+                results[i] = item
+            return (results,)
         except Exception as e:
             print("LLMTranslatorNode error:", e)
             print(traceback.format_exc())
-            return (f"LLM 翻译失败: {e}",)
+            return ([f"LLM 翻译失败: {e}" if t and t.strip() else "" for t in texts],)
 
+    def _translate_one(self, llm, text: str, target_language: str, system_prompt: str = "", use_cache: bool = True,
+                       stream: bool = False, **chunking) -> str:
+        if not text or not text.strip():
+            return ""
 
+        try:
+            if stream:
+                return llm.translate(text=text, target_language=target_language, system_prompt=system_prompt,
+                                     use_cache=use_cache, stream=True, on_chunk=_progress_callback(text), **chunking)
+            return llm.translate(text=text, target_language=target_language, system_prompt=system_prompt,
+                                 use_cache=use_cache, **chunking)
+        except Exception as e:
+            print("LLMTranslatorNode error:", e)
+            print(traceback.format_exc())
+            return f"LLM 翻译失败: {e}"
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Tuple
+
+from .lazy_import import LazyModule
+from .llm_connectors import TRUNCATED_FINISH_REASONS, TruncatedOutputError
+from .metrics import CallRecord, get_metrics, state_labels
+from .provider_stats import get_stats_store
+from .token_utils import estimate_tokens
+
+# 可选依赖：pip install llama-cpp-python，加载模型时才导入
+llama_cpp = LazyModule("llama_cpp")
+
+
+DEFAULT_N_CTX = 4096
+MODEL_EXTENSIONS = (".gguf",)
+
+
+def comfy_models_dir() -> str:
+    """ComfyUI 的 models 目录"""
+    try:
+        import folder_paths
+        return folder_paths.models_dir
+    except ImportError:
+        # 插件位于 ComfyUI/custom_nodes/<插件>/ 下，向上两级即 ComfyUI 根目录
+        return os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "models"))
+
+
+def default_threads() -> int:
+    # 超线程对矩阵运算帮助不大，默认按物理核心数（约为逻辑核心的一半）
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def find_model_file(path: str, model_name: str = "") -> str:
+    """path 为模型文件时直接返回；为目录时返回 model_name 指定的文件或目录下第一个GGUF文件"""
+    if os.path.isfile(path):
+        return path
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Model path not found: {path}")
+    if model_name:
+        candidate = os.path.join(path, model_name)
+        if not os.path.isfile(candidate):
+            raise FileNotFoundError(f"Model file not found: {candidate}")
+        return candidate
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(MODEL_EXTENSIONS):
+            return os.path.join(path, name)
+    raise FileNotFoundError(f"No GGUF model found in {path}")
+
+
+class LocalModel:
+    """已加载的本地GGUF模型，对外提供与服务连接器相同的 invoke 接口。
+
+    llama.cpp 的推理上下文不是线程安全的，同一模型上的调用按顺序执行。
+    """
+
+    provider = "Local"
+
+    def __init__(self, model_path: str, n_ctx: int = DEFAULT_N_CTX, n_threads: int = 0):
+        if not llama_cpp.available():
+            raise RuntimeError("llama-cpp-python is not installed (pip install llama-cpp-python)")
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads or default_threads()
+        # use_mmap：权重以只读方式映射，多个进程/工作流共享同一份页缓存
+        self.llama = llama_cpp.Llama(model_path=model_path, n_ctx=n_ctx, n_threads=self.n_threads,
+                                     n_gpu_layers=0, use_mmap=True, verbose=False)
+        # 输出与输入共用上下文窗口，各预留一半
+        self.max_output_tokens = max(64, n_ctx // 2)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sampling(kwargs):
+        params = {"max_tokens": kwargs.get("max_tokens", 512)}
+        for key in ("temperature", "top_p", "frequency_penalty"):
+            if kwargs.get(key) is not None:
+                params[key] = kwargs[key]
+        return params
+
+    def invoke(self, messages, **kwargs):
+        started = time.monotonic()
+        result = None
+        record = CallRecord()
+        try:
+            with self._lock:
+                response = self.llama.create_chat_completion(messages=messages, **self._sampling(kwargs))
+            # llama.cpp 返回与 OpenAI 相同格式的 usage
+            usage = response.get("usage") or {}
+            record.add_usage({"prompt": usage.get("prompt_tokens"), "completion": usage.get("completion_tokens")})
+            if response["choices"][0].get("finish_reason") in TRUNCATED_FINISH_REASONS:
+                raise TruncatedOutputError("Response truncated: output reached max_tokens.")
+            result = response["choices"][0]["message"]["content"]
+            return result
+        except Exception as e:
+            record.error = e
+            raise
+        finally:
+            self.record_call(started, result, record)
+
+    def invoke_stream(self, messages, on_chunk=None, **kwargs):
+        started = time.monotonic()
+        chunks = []
+        completed = False
+        record = CallRecord()
+        try:
+            with self._lock:
+                for event in self.llama.create_chat_completion(messages=messages, stream=True,
+                                                               **self._sampling(kwargs)):
+                    if event["choices"][0].get("finish_reason") in TRUNCATED_FINISH_REASONS:
+                        raise TruncatedOutputError("Response truncated: output reached max_tokens.")
+                    delta = event["choices"][0].get("delta", {}).get("content") or ""
+                    if not delta:
+                        continue
+                    chunks.append(delta)
+                    if on_chunk is not None:
+                        on_chunk(delta, "".join(chunks))
+            completed = True
+            return "".join(chunks)
+        except Exception as e:
+            record.error = e
+            raise
+        finally:
+            self.record_call(started, "".join(chunks) if completed else None, record)
+
+    async def invoke_async(self, messages, **kwargs):
+        return await asyncio.to_thread(self.invoke, messages, **kwargs)
+
+    def record_call(self, started, result, record=None):
+        ok = result is not None
+        latency = time.monotonic() - started
+        state = self.get_state()
+        get_stats_store().record(state, latency, ok, estimate_tokens(result) if ok else 0)
+        get_metrics().record_call(state_labels(self.provider, state), latency, record)
+
+    def get_state(self):
+        return f"local://{self.model_path}|n_ctx={self.n_ctx}|threads={self.n_threads}"
+
+    def close(self):
+        with self._lock:
+            close = getattr(self.llama, "close", None)
+            if close is not None:
+                close()
+            self.llama = None
+
+
+class LocalModelRegistry:
+    """进程内的本地模型注册表：同一模型只加载一次，按引用计数在最后一个使用者释放后卸载"""
+
+    def __init__(self):
+        self._models: Dict[Tuple, Tuple[LocalModel, int]] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[Tuple, threading.Lock] = {}
+
+    @staticmethod
+    def make_key(model_path: str, n_ctx: int, n_threads: int) -> Tuple:
+        return (os.path.realpath(model_path), int(n_ctx), int(n_threads or default_threads()))
+
+    def acquire(self, model_path: str, n_ctx: int = DEFAULT_N_CTX, n_threads: int = 0) -> LocalModel:
+        """返回已加载的模型并增加引用计数；首次使用时加载"""
+        key = self.make_key(model_path, n_ctx, n_threads)
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        # 同一模型的并发加载请求等待第一个完成，而不是各自加载一份
+        with loading:
+            with self._lock:
+                item = self._models.get(key)
+                if item is not None:
+                    self._models[key] = (item[0], item[1] + 1)
+                    return item[0]
+            started = time.monotonic()
+            model = LocalModel(key[0], n_ctx=key[1], n_threads=key[2])
+            print(f"[LocalModelRegistry] loaded {key[0]} in {time.monotonic() - started:.2f}s "
+                  f"(n_ctx={key[1]}, n_threads={key[2]})")
+            with self._lock:
+                self._models[key] = (model, 1)
+            return model
+
+    def release(self, model: LocalModel):
+        key = self.make_key(model.model_path, model.n_ctx, model.n_threads)
+        with self._lock:
+            item = self._models.get(key)
+            if item is None or item[0] is not model:
+                return
+            if item[1] > 1:
+                self._models[key] = (model, item[1] - 1)
+                return
+            del self._models[key]
+        model.close()
+        print(f"[LocalModelRegistry] unloaded {key[0]}")
+
+    def handle(self, model_path: str, n_ctx: int = DEFAULT_N_CTX, n_threads: int = 0) -> "LocalModelHandle":
+        return LocalModelHandle(self, self.acquire(model_path, n_ctx, n_threads))
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {model.get_state(): refs for model, refs in self._models.values()}
+
+
+class LocalModelHandle:
+    """持有一次模型引用；句柄被回收（或显式 release()）时归还引用"""
+
+    def __init__(self, registry: LocalModelRegistry, model: LocalModel):
+        self.model = model
+        self._finalizer = weakref.finalize(self, registry.release, model)
+
+    def __getattr__(self, name):
+        # invoke / invoke_stream / get_state 等直接转发给模型
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def release(self):
+        self._finalizer()
+
+
+_registry = LocalModelRegistry()
+
+
+def get_local_model_registry() -> LocalModelRegistry:
+    return _registry
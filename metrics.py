@@ -0,0 +1,237 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+# 调用耗时直方图的上界（秒），覆盖从缓存附近的本地服务到长文本生成的范围
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+PREFIX = "owlv_translator_"
+
+# 指标名 -> (类型, 说明, 标签名)
+METRICS = {
+    "calls_total": ("counter", "Translation calls by outcome.", ("provider", "model", "outcome")),
+    "errors_total": ("counter", "Failed translation calls by error type.", ("provider", "model", "type")),
+    "retries_total": ("counter", "Retried requests (timeouts, connection errors, 429/5xx).", ("provider", "model")),
+    "call_duration_seconds": ("histogram", "Translation call latency in seconds, including retries.",
+                              ("provider", "model")),
+    "request_bytes_total": ("counter", "Request body bytes sent.", ("provider", "model")),
+    "response_bytes_total": ("counter", "Response body bytes received.", ("provider", "model")),
+    "tokens_total": ("counter", "Tokens reported in the provider's usage field.", ("provider", "model", "kind")),
+    "cache_lookups_total": ("counter", "Translation cache lookups by result (memory, disk or miss).",
+                            ("engine", "result")),
+    "concurrency_limit": ("gauge", "Current adaptive (AIMD) concurrency limit per backend.", ("backend",)),
+}
+
+
+class CallRecord:
+    """一次调用的附加数据，由调用方在调用过程中填写，结束时交给 MetricsRegistry.record_call"""
+
+    __slots__ = ("request_bytes", "response_bytes", "status_code", "usage", "error")
+
+    def __init__(self):
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status_code: Optional[int] = None
+        # {"prompt": n, "completion": n}，服务端未返回 usage 时为空
+        self.usage: Dict[str, int] = {}
+        self.error: Optional[BaseException] = None
+
+    def add_usage(self, usage: Optional[Dict[str, Optional[int]]]):
+        """合并 usage；流式响应中 usage 可能分散在多个事件里"""
+        for kind, value in (usage or {}).items():
+            if value is not None:
+                self.usage[kind] = int(value)
+
+
+def state_labels(provider: str, state: str) -> Dict[str, str]:
+    """由 connector.get_state() 得到 provider/model 标签。
+
+    状态格式为 "<地址>|<模型>"；本地模型为 "local://<路径>|n_ctx=...|..."，以文件名作为模型名。
+    """
+    address, _, rest = state.partition("|")
+    if address.startswith("local://"):
+        model = os.path.basename(address[len("local://"):])
+    else:
+        model = rest.split("|", 1)[0]
+    return {"provider": provider, "model": model}
+
+
+def error_type(record: CallRecord) -> str:
+    """错误分类：非200状态码为 http_<状态码>，其余按异常链归为 timeout/connection/parse 或异常类名"""
+    error = record.error
+    status_code = getattr(error, "status_code", None) or record.status_code
+    if status_code and status_code != 200:
+        return f"http_{status_code}"
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        name = type(error).__name__
+        if "Timeout" in name:
+            return "timeout"
+        if "Connection" in name or name in ("ChunkedEncodingError", "ClientPayloadError"):
+            return "connection"
+        if isinstance(error, ValueError):
+            return "parse"
+        error = error.__cause__ or error.__context__
+    return type(record.error).__name__ if record.error is not None else "unknown"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """进程内的翻译调用指标：计数器、仪表与耗时直方图，按 METRICS 中声明的标签区分，可导出为 Prometheus 文本或JSON"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple[str, ...], float]] = {}
+        self._gauges: Dict[str, Dict[Tuple[str, ...], float]] = {}
+        self._histograms: Dict[str, Dict[Tuple[str, ...], Histogram]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in METRICS[name][2])
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1):
+        key = self._key(name, labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, labels: Dict[str, str], value: float):
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def _values(self, name: str) -> Dict[Tuple[str, ...], float]:
+        return self._counters.get(name) or self._gauges.get(name) or {}
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        key = self._key(name, labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(value)
+
+    def record_call(self, labels: Dict[str, str], latency: float, record: Optional[CallRecord] = None):
+        """记录一次完整调用（含重试）：成败、错误类型、耗时、收发字节与 usage 中的token数"""
+        record = record or CallRecord()
+        ok = record.error is None
+        self.inc("calls_total", {**labels, "outcome": "ok" if ok else "error"})
+        if not ok:
+            self.inc("errors_total", {**labels, "type": error_type(record)})
+        self.observe("call_duration_seconds", labels, latency)
+        if record.request_bytes:
+            self.inc("request_bytes_total", labels, record.request_bytes)
+        if record.response_bytes:
+            self.inc("response_bytes_total", labels, record.response_bytes)
+        for kind, tokens in record.usage.items():
+            self.inc("tokens_total", {**labels, "kind": kind}, tokens)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON 形式：{指标名: {"type", "help", "samples": [{"labels", "value"} 或 {"labels", "buckets", "sum", "count"}]}}"""
+        with self._lock:
+            result = {}
+            for name, (kind, help_text, label_names) in METRICS.items():
+                samples = []
+                for key, value in self._values(name).items():
+                    samples.append({"labels": dict(zip(label_names, key)), "value": value})
+                for key, histogram in self._histograms.get(name, {}).items():
+                    samples.append({
+                        "labels": dict(zip(label_names, key)),
+                        "buckets": {str(bound): count for bound, count in histogram.cumulative()},
+                        "sum": histogram.sum,
+                        "count": histogram.count,
+                    })
+                result[PREFIX + name] = {"type": kind, "help": help_text, "samples": samples}
+            return result
+
+    def prometheus(self) -> str:
+        """Prometheus 文本格式 (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, label_names) in METRICS.items():
+                full_name = PREFIX + name
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for key, value in sorted(self._values(name).items()):
+                    lines.append(f"{full_name}{_format_labels(label_names, key)} {_format_value(value)}")
+                for key, histogram in sorted(self._histograms.get(name, {}).items()):
+                    for bound, count in histogram.cumulative():
+                        labels = _format_labels(label_names, key, f'le="{_format_value(bound)}"')
+                        lines.append(f"{full_name}_bucket{labels} {count}")
+                    labels = _format_labels(label_names, key, 'le="+Inf"')
+                    lines.append(f"{full_name}_bucket{labels} {histogram.count}")
+                    lines.append(f"{full_name}_sum{_format_labels(label_names, key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{full_name}_count{_format_labels(label_names, key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _registry
+
+
+METRICS_ROUTE = "/owlv_translator/metrics"
+
+
+def register_routes(server):
+    """在 ComfyUI 的 PromptServer 上注册指标路由：
+
+    GET /owlv_translator/metrics       Prometheus 文本格式
+    GET /owlv_translator/metrics.json  JSON
+    """
+    from aiohttp import web
+
+    @server.routes.get(METRICS_ROUTE)
+    async def metrics_prometheus(request):
+        return web.Response(body=get_metrics().prometheus().encode("utf-8"),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    @server.routes.get(METRICS_ROUTE + ".json")
+    async def metrics_json(request):
+        return web.json_response(get_metrics().snapshot())
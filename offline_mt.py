@@ -0,0 +1,201 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from .lazy_import import LazyModule
+from .local_llm import comfy_models_dir, default_threads
+from .text_chunker import join_chunks, split_text
+
+# 可选依赖：pip install ctranslate2 transformers sentencepiece；transformers 导入很慢，加载模型时才导入
+ctranslate2 = LazyModule("ctranslate2")
+transformers = LazyModule("transformers")
+
+
+# 离线模型目录，其中每个子目录是一个用 ct2-transformers-converter 转换的模型
+MT_MODEL_DIR = os.environ.get("OWLV_MT_MODEL_DIR", "")
+DEFAULT_BEAM_SIZE = 4
+DEFAULT_MAX_BATCH_SIZE = 32
+# Marian 的输入上限为512个token，超过该长度的文本先按句子分段
+MAX_SEGMENT_TOKENS = 200
+MAX_CACHED_MODELS = int(os.environ.get("OWLV_MT_MAX_MODELS", "4"))
+
+# ISO 639-1 代码到 NLLB (FLORES-200) 代码
+NLLB_CODES = {
+    "en": "eng_Latn", "zh": "zho_Hans", "ja": "jpn_Jpan", "ko": "kor_Hang", "fr": "fra_Latn",
+    "de": "deu_Latn", "es": "spa_Latn", "it": "ita_Latn", "ru": "rus_Cyrl", "pt": "por_Latn",
+}
+
+_KANA = re.compile("[\u3040-\u30ff]")
+_HANGUL = re.compile("[\uac00-\ud7af]")
+_HAN = re.compile("[\u4e00-\u9fff]")
+_CYRILLIC = re.compile("[\u0400-\u04ff]")
+_WORD = re.compile(r"[^\W\d_]+")
+
+# 无法确定具体语言的拉丁字母文本，只能交给多语言 NLLB 模型
+LATIN = "latn"
+# 拉丁字母语言的常用词与特有字母，用于区分源语言
+_LATIN_HINTS = {
+    "en": ({"the", "and", "of", "to", "is", "are", "with", "in", "on", "for", "this", "that", "hello"}, ""),
+    "fr": ({"le", "la", "les", "des", "et", "est", "une", "du", "dans", "avec", "pour", "sur", "je", "vous",
+            "nous", "bonjour", "monde"}, "çœêèàùûî"),
+    "de": ({"der", "die", "das", "und", "ist", "nicht", "mit", "ein", "eine", "auf", "für", "ich", "sie", "wir",
+            "guten", "morgen", "tag", "welt"}, "ßäöü"),
+    "es": ({"el", "los", "las", "y", "es", "una", "del", "con", "para", "por", "muy", "hola", "mundo"}, "ñ¿¡"),
+    "it": ({"il", "lo", "gli", "e", "è", "della", "con", "per", "che", "non", "sono", "ciao", "buongiorno"}, "ìò"),
+    "pt": ({"o", "os", "as", "e", "é", "uma", "do", "da", "com", "para", "não", "em", "olá", "bom", "dia"}, "ãõ"),
+}
+
+
+def detect_language(text: str) -> str:
+    """按文字体系判断源语言；拉丁字母文本按常用词与特有字母打分。
+
+    没有任何线索的纯ASCII文本（如提示词标签）按英语处理，其余无法确定的拉丁字母文本返回 LATIN。
+    """
+    if _KANA.search(text):
+        return "ja"
+    if _HANGUL.search(text):
+        return "ko"
+    if _HAN.search(text):
+        return "zh"
+    if _CYRILLIC.search(text):
+        return "ru"
+    lowered = text.lower()
+    words = _WORD.findall(lowered)
+    scores = sorted(((sum(1 for word in words if word in stopwords)
+                      + 2 * sum(1 for char in lowered if char in letters), language)
+                     for language, (stopwords, letters) in _LATIN_HINTS.items()), reverse=True)
+    if scores[0][0] > 0 and scores[0][0] > scores[1][0]:
+        return scores[0][1]
+    return "en" if text.isascii() and not scores[0][0] else LATIN
+
+
+def mt_model_dir() -> str:
+    return MT_MODEL_DIR or os.path.join(comfy_models_dir(), "MT")
+
+
+def find_mt_model(source: str, target: str) -> Tuple[str, str]:
+    """返回 (模型目录, 类型)：优先该语言对的 Marian 模型 (opus-mt-{src}-{tgt})，否则使用多语言 NLLB 模型。
+
+    源语言为 LATIN（无法确定的拉丁字母文本）时只能使用 NLLB。
+    """
+    root = mt_model_dir()
+    names = sorted(os.listdir(root)) if os.path.isdir(root) else []
+    prefix = f"opus-mt-{source}-{target}"
+    if source != LATIN:
+        for name in names:
+            if name.lower().startswith(prefix):
+                return os.path.join(root, name), "marian"
+    for name in names:
+        if "nllb" in name.lower():
+            return os.path.join(root, name), "nllb"
+    if source == LATIN:
+        raise FileNotFoundError(
+            f"Could not detect the source language; select source_language or add an NLLB model to {root}"
+        )
+    raise FileNotFoundError(
+        f"No offline MT model for {source}->{target} in {root}. Convert one with e.g. "
+        f"ct2-transformers-converter --model Helsinki-NLP/{prefix} --output_dir {os.path.join(root, prefix)} "
+        f"--quantization int8 --copy_files source.spm target.spm vocab.json tokenizer_config.json"
+    )
+
+
+class OfflineTranslator:
+    """CTranslate2 上运行的 Marian/NLLB 翻译模型（CPU int8 量化），按批次做束搜索"""
+
+    def __init__(self, model_dir: str, kind: str = "marian", intra_threads: int = 0):
+        if not (ctranslate2.available() and transformers.available()):
+            raise RuntimeError("Offline translation requires: pip install ctranslate2 transformers sentencepiece")
+        self.model_dir = model_dir
+        self.kind = kind
+        self.translator = ctranslate2.Translator(model_dir, device="cpu", compute_type="int8",
+                                                 intra_threads=intra_threads or default_threads())
+        self.tokenizer = transformers.AutoTokenizer.from_pretrained(model_dir)
+        # 分词器（尤其是 fast tokenizer）不能被多个线程同时使用
+        self._tokenizer_lock = threading.Lock()
+
+    def _encode(self, texts: Sequence[str], source: str) -> List[List[str]]:
+        with self._tokenizer_lock:
+            if self.kind == "nllb":
+                self.tokenizer.src_lang = NLLB_CODES.get(source, "eng_Latn")
+            return [self.tokenizer.convert_ids_to_tokens(self.tokenizer.encode(text)) for text in texts]
+
+    def _decode(self, tokens: List[str]) -> str:
+        with self._tokenizer_lock:
+            return self.tokenizer.decode(self.tokenizer.convert_tokens_to_ids(tokens), skip_special_tokens=True)
+
+    def translate_batch(self, texts: Sequence[str], source: str, target: str,
+                        beam_size: int = DEFAULT_BEAM_SIZE,
+                        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> List[str]:
+        if not texts:
+            return []
+        tokens = self._encode(texts, source)
+        target_prefix = None
+        if self.kind == "nllb":
+            target_prefix = [[NLLB_CODES.get(target, "eng_Latn")]] * len(texts)
+        results = self.translator.translate_batch(tokens, target_prefix=target_prefix, beam_size=beam_size,
+                                                  max_batch_size=max_batch_size)
+        outputs = []
+        for result in results:
+            hypothesis = result.hypotheses[0]
+            # NLLB 的输出以目标语言标记开头
+            outputs.append(self._decode(hypothesis[1:] if self.kind == "nllb" else hypothesis))
+        return outputs
+
+
+class OfflineTranslatorCache:
+    """按模型目录缓存已加载的翻译模型：首次用到某个语言对时才加载，超过上限时淘汰最久未用的"""
+
+    def __init__(self, max_models: int = MAX_CACHED_MODELS):
+        self.max_models = max_models
+        self._models: "OrderedDict[str, OfflineTranslator]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source: str, target: str) -> OfflineTranslator:
+        model_dir, kind = find_mt_model(source, target)
+        with self._lock:
+            model = self._models.get(model_dir)
+            if model is not None:
+                self._models.move_to_end(model_dir)
+                return model
+            # 在锁内加载：同一时间只加载一个模型，避免并发请求重复加载
+            started = time.monotonic()
+            model = OfflineTranslator(model_dir, kind)
+            print(f"[OfflineMT] loaded {model_dir} ({kind}) in {time.monotonic() - started:.2f}s")
+            self._models[model_dir] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return model
+
+
+_cache = OfflineTranslatorCache()
+
+
+def get_offline_translator(source: str, target: str) -> OfflineTranslator:
+    return _cache.get(source, target)
+
+
+def offline_translate_many(texts: Sequence[str], target: str, beam_size: int = DEFAULT_BEAM_SIZE,
+                           source: Optional[str] = None) -> List[str]:
+    """离线批量翻译：按源语言分组，每组长文本按句分段后整体做一次批量束搜索"""
+    results: List[str] = [""] * len(texts)
+    groups = {}
+    for i, text in enumerate(texts):
+        if text and text.strip():
+            groups.setdefault(source or detect_language(text), []).append(i)
+
+    for src, indices in groups.items():
+        # 源语言与目标语言相同时原样返回（调用方不应缓存这种结果）
+        if src == target:
+            for i in indices:
+                results[i] = texts[i]
+            continue
+        translator = get_offline_translator(src, target)
+        chunked = [split_text(texts[i], MAX_SEGMENT_TOKENS) for i in indices]
+        segments = [chunk.body for chunks in chunked for chunk in chunks if chunk.body]
+        translated = iter(translator.translate_batch(segments, src, target, beam_size=beam_size))
+        for i, chunks in zip(indices, chunked):
+            results[i] = join_chunks(chunks, [next(translated) if chunk.body else "" for chunk in chunks])
+    return results
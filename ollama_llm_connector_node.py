@@ -1,7 +1,11 @@
+import threading
 import traceback
 from typing import Tuple
 
+from .connector_registry import get_connector_registry
 from .llm_client import LLMClient
+from .llm_connectors import OllamaConnector
+from .retry_policy import DEFAULT_DEADLINE, DEFAULT_MAX_RETRIES, RetryPolicy
 
 
 class OllamaLLMConnectorNode:
@@ -15,6 +19,11 @@ class OllamaLLMConnectorNode:
             "optional": {
                 "api_key": ("STRING", {"default": "", "password": True}),
                 "system_prompt": ("STRING", {"default": "You are a translation engine. Only output the translated text.", "multiline": True}),
+                # 模型在两次请求之间保持加载的时长，如 "30m"、"2h"，"-1" 表示常驻
+                "keep_alive": ("STRING", {"default": "30m"}),
+                "preload": ("BOOLEAN", {"default": True}),
+                "max_retries": ("INT", {"default": DEFAULT_MAX_RETRIES, "min": 0, "max": 10}),
+                "retry_deadline": ("FLOAT", {"default": DEFAULT_DEADLINE, "min": 1.0, "max": 600.0, "step": 1.0}),
             }
         }
 
@@ -23,15 +32,31 @@ class OllamaLLMConnectorNode:
     FUNCTION = "connect"
     CATEGORY = "Text Processing/LLM"
 
-    def connect(self, host: str, model: str, api_key: str = "", system_prompt: str = "") -> Tuple[object]:
+    def connect(self, host: str, model: str, api_key: str = "", system_prompt: str = "",
+                keep_alive: str = "30m", preload: bool = True, max_retries: int = DEFAULT_MAX_RETRIES,
+                retry_deadline: float = DEFAULT_DEADLINE) -> Tuple[object]:
         try:
-            config = {
-                "host": host,
-                "model": model,
-                "api_key": api_key,
-                "system_prompt": system_prompt,
-            }
-            client = LLMClient(kind="ollama", config=config)
+            def build_client():
+                connector = OllamaConnector(host, model, api_key, keep_alive=keep_alive)
+                connector.retry_policy = RetryPolicy(max_retries=max_retries, deadline=retry_deadline)
+                config = {
+                    "provider": "Ollama",
+                    "host": host,
+                    "model": model,
+                    "api_key": api_key,
+                    "system_prompt": system_prompt,
+                    "connector": connector,
+                }
+                return LLMClient(kind="ollama", config=config)
+
+            # 输入不变时复用已登记的客户端，保留其连接与运行状态
+            client = get_connector_registry().get_or_create("Ollama", model, api_key, build_client, api_url=host,
+                                                            options=(system_prompt, keep_alive, max_retries,
+                                                                     retry_deadline))
+            if preload:
+                # 在后台预加载模型，冷启动的耗时与工作流中其它节点的执行重叠
+                threading.Thread(target=self._preload, args=(client.config["connector"],),
+                                 name="owlv-ollama-preload", daemon=True).start()
             return (client,)
         except Exception as e:
             print("OllamaLLMConnectorNode error:", e)
@@ -39,5 +64,9 @@ class OllamaLLMConnectorNode:
             client = LLMClient(kind="ollama", config={"host": host, "model": model, "error": str(e)})
             return (client,)
 
-
-
+    @staticmethod
+    def _preload(connector: OllamaConnector):
+        try:
+            connector.preload()
+        except Exception as e:
+            print("OllamaLLMConnectorNode preload error:", e)
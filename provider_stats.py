@@ -0,0 +1,196 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+
+STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "provider_stats.json")
+WINDOW = 200
+MIN_SAMPLES = 10
+SAVE_INTERVAL = 30.0
+
+# 各模型大致的混合单价（美元 / 百万token），按模型名子串匹配；
+# 仅用于相对比较，可通过 set_price 或 cache/provider_prices.json 覆盖
+DEFAULT_PRICES = {
+    "gpt-4o-mini": 0.3,
+    "gpt-4o": 5.0,
+    "gpt-4-turbo": 15.0,
+    "gpt-3.5-turbo": 1.0,
+    "o1-mini": 6.0,
+    "o1": 30.0,
+    "claude-3-haiku": 0.6,
+    "claude-3-5-sonnet": 6.0,
+    "claude-3-sonnet": 6.0,
+    "claude-3-opus": 30.0,
+    "deepseek": 0.5,
+    "moonshot-v1-8k": 1.7,
+    "moonshot-v1-32k": 3.4,
+    "moonshot-v1-128k": 8.5,
+    "glm-4": 1.4,
+    "glm-3-turbo": 0.14,
+    "qwen-turbo": 0.2,
+    "qwen-plus": 0.8,
+    "qwen-max": 5.0,
+    "gemini-1.5-flash": 0.2,
+    "gemini-2.0-flash": 0.2,
+    "gemini-1.5-pro": 3.5,
+    "grok": 5.0,
+}
+PRICES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "provider_prices.json")
+
+
+class ProviderStats:
+    """单个后端（connector get_state()）的滚动统计：延迟、错误率与输出速率。
+
+    censored 为被取消请求（对冲落败）已等待的时间，只是延迟的下限，不计入成败、错误率与延迟分位数。
+    """
+
+    def __init__(self, latencies=(), outcomes=(), throughputs=(), censored=()):
+        self.latencies: Deque[float] = deque(latencies, maxlen=WINDOW)
+        self.outcomes: Deque[int] = deque(outcomes, maxlen=WINDOW)
+        self.throughputs: Deque[float] = deque(throughputs, maxlen=WINDOW)
+        self.censored: Deque[float] = deque(censored, maxlen=WINDOW)
+
+    @property
+    def attempts(self) -> int:
+        """已完成与被取消的请求数"""
+        return len(self.outcomes) + len(self.censored)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if len(self.throughputs) < MIN_SAMPLES:
+            return None
+        return sum(self.throughputs) / len(self.throughputs)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self.outcomes),
+            "censored": len(self.censored),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "error_rate": self.error_rate,
+            "tokens_per_second": self.tokens_per_second,
+        }
+
+    def to_dict(self) -> Dict[str, List[float]]:
+        return {"latencies": list(self.latencies), "outcomes": list(self.outcomes), "throughputs": list(self.throughputs),
+                "censored": list(self.censored)}
+
+
+class StatsStore:
+    """按后端保存统计信息，并定期持久化到磁盘，重启后继续使用"""
+
+    def __init__(self, path: str = STATS_PATH):
+        self.path = path
+        self._stats: Dict[str, ProviderStats] = {}
+        self._prices: Dict[str, float] = dict(DEFAULT_PRICES)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def _load_locked(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for key, data in json.load(f).items():
+                    self._stats[key] = ProviderStats(data.get("latencies", ()), data.get("outcomes", ()),
+                                                     data.get("throughputs", ()), data.get("censored", ()))
+        except (OSError, ValueError):
+            pass
+        try:
+            with open(PRICES_PATH, "r", encoding="utf-8") as f:
+                self._prices.update({k: float(v) for k, v in json.load(f).items()})
+        except (OSError, ValueError):
+            pass
+
+    def _get_locked(self, key: str) -> ProviderStats:
+        self._load_locked()
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = ProviderStats()
+        return stats
+
+    def record(self, key: str, latency: float, ok: bool, output_tokens: int = 0):
+        with self._lock:
+            stats = self._get_locked(key)
+            stats.outcomes.append(1 if ok else 0)
+            if ok:
+                stats.latencies.append(latency)
+                if output_tokens and latency > 0:
+                    stats.throughputs.append(output_tokens / latency)
+            self._dirty = True
+            if time.monotonic() - self._last_save > SAVE_INTERVAL:
+                self._save_locked()
+
+    def record_censored(self, key: str, latency: float):
+        """记录被取消请求已等待的时间（延迟的下限），不影响成败与错误率"""
+        with self._lock:
+            self._get_locked(key).censored.append(latency)
+            self._dirty = True
+
+    def get(self, key: str) -> ProviderStats:
+        with self._lock:
+            return self._get_locked(key)
+
+    def price(self, key: str) -> Optional[float]:
+        """按模型名子串匹配单价，优先最长的匹配项"""
+        with self._lock:
+            self._load_locked()
+            matches = [name for name in self._prices if name in key]
+            if not matches:
+                return None
+            return self._prices[max(matches, key=len)]
+
+    def set_price(self, model_substring: str, price: float):
+        with self._lock:
+            self._load_locked()
+            self._prices[model_substring] = price
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._load_locked()
+            return {key: stats.summary() for key, stats in self._stats.items()}
+
+    def _save_locked(self):
+        self._last_save = time.monotonic()
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({key: stats.to_dict() for key, stats in self._stats.items()}, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            print("ProviderStats save error:", e)
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+
+_store = StatsStore()
+atexit.register(_store.save)
+
+
+def get_stats_store() -> StatsStore:
+    return _store
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .translation_cache import fingerprint_secret
+
+
+# 各服务商默认配额 (每分钟请求数RPM, 每分钟token数TPM)，None 表示不限制；
+# 数值取各平台入门档位，账号档位更高时可通过连接器节点的 rpm_limit/tpm_limit、
+# 环境变量 OWLV_RATE_LIMIT_<服务商>（如 OWLV_RATE_LIMIT_GEMINI=1000/4000000）或 configure_rate_limit 调整；
+# OWLV_RATE_LIMITS=off 关闭所有默认配额
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+    "SiliconFlow": (1000, 50000),
+    "ZhiPu": (300, 200000),
+    "Moonshot": (200, 128000),
+    "DeepSeek": (None, None),
+    "OpenAI": (500, 200000),
+    "AzureOpenAI": (300, 60000),
+    "Qwen": (600, 1000000),
+    "Claude": (50, 40000),
+    "Grok": (60, 100000),
+    "Gemini": (15, 1000000),
+}
+
+
+class TokenBucket:
+    """令牌桶：capacity 为桶容量，rate 为每秒补充量"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def resize(self, capacity: float, rate: float, now: float):
+        """修改容量与补充速率，已累积的令牌按新容量截断"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = min(self.tokens, capacity)
+
+    def reserve(self, amount: float, now: float) -> float:
+        """预占 amount 个令牌（允许透支），返回需要等待的秒数"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # 单次请求超过桶容量时按容量计，避免永远等待
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """按RPM与TPM同时计量的客户端限流器，线程安全"""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.limits = (rpm, tpm)
+        self.requests = TokenBucket(rpm, rpm / 60.0) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60.0) if tpm else None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _resized(bucket: Optional[TokenBucket], per_minute: Optional[int], now: float) -> Optional[TokenBucket]:
+        if not per_minute:
+            return None
+        if bucket is None:
+            return TokenBucket(per_minute, per_minute / 60.0)
+        bucket.resize(per_minute, per_minute / 60.0, now)
+        return bucket
+
+    def configure(self, rpm: Optional[int], tpm: Optional[int]):
+        """修改配额，保留已预占的额度（同一账号的所有请求继续共用这两个桶）"""
+        now = time.monotonic()
+        with self._lock:
+            if (rpm, tpm) == self.limits:
+                return
+            self.limits = (rpm, tpm)
+            self.requests = self._resized(self.requests, rpm, now)
+            self.tokens = self._resized(self.tokens, tpm, now)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """为一次请求预占额度，返回发送前需要等待的秒数"""
+        now = time.monotonic()
+        with self._lock:
+            delay = 0.0
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1, now))
+            if self.tokens is not None and tokens:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            return delay
+
+    def acquire(self, tokens: int = 0) -> float:
+        """阻塞直到额度可用，返回实际等待的秒数"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_qps_limiters: Dict[Tuple[str, str, float], RateLimiter] = {}
+_overrides: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+_limiters_lock = threading.Lock()
+
+
+def configure_rate_limit(provider: str, rpm: Optional[int], tpm: Optional[int]):
+    """修改服务商的默认配额，已创建的限流器在下次获取时按新配额调整"""
+    with _limiters_lock:
+        _overrides[provider] = (rpm, tpm)
+
+
+def _env_rate_limit(provider: str, default: Tuple[Optional[int], Optional[int]]):
+    """按环境变量调整默认配额：OWLV_RATE_LIMIT_<服务商>="<rpm>/<tpm>"，某项留空保持默认、为0不限制，"off" 全部不限制"""
+    if os.environ.get("OWLV_RATE_LIMITS", "").strip().lower() in ("0", "off", "false", "no"):
+        default = (None, None)
+    value = os.environ.get(f"OWLV_RATE_LIMIT_{provider.upper()}", "").strip().lower()
+    if not value:
+        return default
+    if value in ("0", "off", "false", "no"):
+        return None, None
+    limits = list(default)
+    for i, part in enumerate(value.split("/")[:2]):
+        part = part.strip()
+        if part:
+            try:
+                limits[i] = int(float(part)) or None
+            except ValueError:
+                print(f"Ignoring invalid OWLV_RATE_LIMIT_{provider.upper()}: {value}")
+                return default
+    return tuple(limits)
+
+
+def resolve_rate_limit(provider: str, limits: Optional[Tuple[int, int]] = None) -> Tuple[Optional[int], Optional[int]]:
+    """返回服务商生效的 (RPM, TPM)。
+
+    limits 为连接器节点上的设置，每项 -1 表示沿用默认、0 表示不限制；
+    默认值依次取 configure_rate_limit 的设置、环境变量与 DEFAULT_RATE_LIMITS。
+    """
+    with _limiters_lock:
+        override = _overrides.get(provider)
+    rpm, tpm = override or _env_rate_limit(provider, DEFAULT_RATE_LIMITS.get(provider, (None, None)))
+    if limits is not None:
+        node_rpm, node_tpm = limits
+        if node_rpm is not None and node_rpm >= 0:
+            rpm = node_rpm or None
+        if node_tpm is not None and node_tpm >= 0:
+            tpm = node_tpm or None
+    return rpm, tpm
+
+
+def get_rate_limiter(provider: str, api_key: str = "",
+                     limits: Optional[Tuple[int, int]] = None) -> Optional[RateLimiter]:
+    """返回 (服务商, API密钥) 共享的限流器；没有配额时返回None。limits 的含义见 resolve_rate_limit。
+
+    配额属于账号，同一密钥的连接器设置了不同的 limits 时仍共用同一组令牌桶，以最近一次调用的配额为准。
+    """
+    rpm, tpm = resolve_rate_limit(provider, limits)
+    if not rpm and not tpm:
+        return None
+    with _limiters_lock:
+        key = (provider, fingerprint_secret(api_key))
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(rpm, tpm)
+            _limiters[key] = limiter
+    limiter.configure(rpm, tpm)
+    return limiter
+
+
+def get_qps_limiter(provider: str, api_key: str, qps: Optional[float]) -> Optional[RateLimiter]:
+    """返回按每秒请求数 (QPS) 限流的共享限流器，qps 为空或0时不限制。
+
+    与 RPM 配额不同，桶容量只有一秒的额度，不允许整分钟的突发请求。
+    """
+    if not qps or qps <= 0:
+        return None
+    with _limiters_lock:
+        key = (provider, fingerprint_secret(api_key), float(qps))
+        limiter = _qps_limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter()
+            limiter.requests = TokenBucket(max(1.0, qps), float(qps))
+            _qps_limiters[key] = limiter
+        return limiter
@@ -0,0 +1,95 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+
+# 这些状态码表示限流或服务端临时故障，可以安全重试
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 20.0
+DEFAULT_DEADLINE = 120.0
+
+
+class RetryableError(Exception):
+    """可重试的请求错误（超时、连接中断、429/5xx），retry_after 为服务端建议的等待秒数"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头，支持秒数与HTTP日期两种格式"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """指数退避 + 抖动的重试策略，优先遵循 Retry-After，并受总截止时间约束"""
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY, deadline: float = DEFAULT_DEADLINE):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # full jitter：在 [0, base * 2^attempt] 内随机取值
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _next_delay(self, attempt: int, error: RetryableError, started: float) -> Optional[float]:
+        """返回下一次重试前的等待秒数；不应再重试时返回None"""
+        if attempt >= self.max_retries:
+            return None
+        delay = self.compute_delay(attempt, error.retry_after)
+        if self.deadline and time.monotonic() - started + delay > self.deadline:
+            return None
+        return delay
+
+    def call(self, fn: Callable[[], Any]) -> Tuple[Any, int]:
+        """执行 fn()，遇到 RetryableError 时按策略重试，返回 (结果, 重试次数)。
+
+        重试不打印日志，由调用方计入 owlv_translator_retries_total 指标
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                return fn(), attempt
+            except RetryableError as e:
+                delay = self._next_delay(attempt, e, started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, int]:
+        """call 的异步版本"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                return await fn(), attempt
+            except RetryableError as e:
+                delay = self._next_delay(attempt, e, started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
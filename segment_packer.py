@@ -0,0 +1,323 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .concurrent_executor import run_concurrently
+from .http_pool import get_session, requests
+from .metrics import CallRecord, get_metrics
+from .rate_limiter import get_qps_limiter
+from .retry_policy import RETRYABLE_STATUS_CODES, RetryableError, RetryPolicy, parse_retry_after
+
+
+def pack_segments(sizes: Sequence[int], max_size: int, max_items: Optional[int] = None) -> List[List[int]]:
+    """按顺序把条目贪心地装入尽量少的分组，每组总大小不超过 max_size、条数不超过 max_items。
+
+    单条就超过上限的条目独占一组，由服务端返回错误。
+    """
+    groups: List[List[int]] = []
+    current_size = 0
+    for index, size in enumerate(sizes):
+        if not groups or current_size + size > max_size or (max_items and len(groups[-1]) >= max_items):
+            groups.append([])
+            current_size = 0
+        groups[-1].append(index)
+        current_size += size
+    return groups
+
+
+class SegmentBatchTranslator:
+    """把多条文本打包进尽量少的请求发送，再把结果映射回各条输入。
+
+    子类实现 _request(segments, target_lang) 返回与 segments 对齐的译文列表（单条失败为None），
+    请求失败时抛出的异常信息接在 "<服务>错误" 之后作为该组条目的结果。
+    同一账号的请求共享 QPS 限流器，频率超限等临时错误按 retry_policy 重试。
+    """
+
+    service = ""
+    # 未指定 qps 时使用的默认值（None 表示不限制）
+    default_qps: Optional[float] = None
+    # 服务端返回这些错误码时可以重试
+    retryable_codes = ()
+
+    def __init__(self, app_id: str, secret_key: str, qps: Optional[float] = None, timeout: float = 10):
+        self.app_id = app_id
+        self.secret_key = secret_key
+        self.timeout = timeout
+        self.limiter = get_qps_limiter(self.service, app_id, qps or self.default_qps)
+        self.retry_policy = RetryPolicy()
+
+    def segment_size(self, segment: str) -> int:
+        return len(segment)
+
+    def max_request_size(self) -> int:
+        raise NotImplementedError
+
+    def max_request_items(self) -> Optional[int]:
+        return None
+
+    def _request(self, segments: List[str], target_lang: str) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    def _post(self, **kwargs) -> dict:
+        """POST 到 self.url 并解析JSON；超时、连接中断、响应体不完整与429/5xx转为 RetryableError"""
+        try:
+            response = get_session(self.url).post(self.url, timeout=self.timeout, **kwargs)
+        except requests.exceptions.Timeout:
+            raise RetryableError(f": 请求超时（{self.timeout}秒）")
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            raise RetryableError(f": 请求失败: {e}")
+        # 收发字节按每次HTTP请求计入（包括随后重试的请求）
+        labels = self.metric_labels()
+        get_metrics().inc("request_bytes_total", labels, len(response.request.body or b""))
+        get_metrics().inc("response_bytes_total", labels, len(response.content))
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableError(f": HTTP {response.status_code}", status_code=response.status_code,
+                                 retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        try:
+            return response.json()
+        except ValueError:
+            raise Exception(f": 无法解析响应 (HTTP {response.status_code})")
+
+    def metric_labels(self) -> Dict[str, str]:
+        return {"provider": self.service, "model": ""}
+
+    def _send(self, segments: List[str], target_lang: str) -> List[Optional[str]]:
+        attempts = [0]
+
+        def attempt():
+            attempts[0] += 1
+            if attempts[0] > 1:
+                get_metrics().inc("retries_total", self.metric_labels())
+            if self.limiter is not None:
+                self.limiter.acquire()
+            return self._request(segments, target_lang)
+
+        started = time.monotonic()
+        record = CallRecord()
+        try:
+            results, _ = self.retry_policy.call(attempt)
+            return results
+        except Exception as e:
+            record.error = e
+            raise
+        finally:
+            get_metrics().record_call(self.metric_labels(), time.monotonic() - started, record)
+
+    def translate_segments(self, segments: Sequence[str], target_lang: str,
+                           max_workers: int = 1) -> Tuple[List[Optional[str]], Dict[int, str]]:
+        """翻译一组文本片段，返回 (与输入对齐的译文, {失败片段下标: 错误信息})"""
+        groups = pack_segments([self.segment_size(s) for s in segments], self.max_request_size(),
+                               self.max_request_items())
+        responses, errors = run_concurrently(
+            lambda group: self._send([segments[i] for i in group], target_lang),
+            groups, max_workers, provider_key=self.service,
+        )
+        results: List[Optional[str]] = [None] * len(segments)
+        failures: Dict[int, str] = {}
+        for group, response, error in zip(groups, responses, errors):
+            for position, index in enumerate(group):
+                if error is not None:
+                    failures[index] = str(error)
+                elif response[position] is None:
+                    failures[index] = ": 未返回译文"
+                else:
+                    results[index] = response[position]
+        return results, failures
+
+    def translate_many(self, texts: Sequence[str], target_lang: str, max_workers: int = 1) -> List[str]:
+        """批量翻译多条文本，失败的条目返回错误信息"""
+        results, failures = self.translate_segments(list(texts), target_lang, max_workers)
+        return [result if result is not None else f"{self.service}错误{failures[i]}"
+                for i, result in enumerate(results)]
+
+
+class BaiduBatchTranslator(SegmentBatchTranslator):
+    """百度通用翻译：q 中的每一行单独翻译并在 trans_result 中按顺序返回"""
+
+    service = "百度翻译"
+    url = "https://fanyi-api.baidu.com/api/trans/vip/translate"
+    # 标准版账号 QPS=1
+    default_qps = 1.0
+    # 单次请求 q 不超过 6000 字节
+    max_bytes = 6000
+    # 52001 请求超时、52002 系统错误、54003 访问频率受限
+    retryable_codes = ("52001", "52002", "54003")
+
+    def segment_size(self, segment: str) -> int:
+        return len(segment.encode("utf-8")) + 1
+
+    def max_request_size(self) -> int:
+        return self.max_bytes
+
+    def _request(self, segments: List[str], target_lang: str) -> List[Optional[str]]:
+        q = "\n".join(segments)
+        salt = str(int(time.time() * 1000))
+        sign = hashlib.md5((self.app_id + q + salt + self.secret_key).encode("utf-8")).hexdigest()
+        data = {"q": q, "from": "auto", "to": target_lang, "appid": self.app_id, "salt": salt, "sign": sign}
+        # 使用 POST 表单，避免长文本超出URL长度限制
+        result = self._post(data=data)
+
+        if "trans_result" not in result:
+            error_code = str(result.get("error_code", "未知"))
+            message = f" [{error_code}]: {result.get('error_msg', '未知错误')}"
+            if error_code in self.retryable_codes:
+                raise RetryableError(message, retry_after=1.0)
+            raise Exception(message)
+        translations = [item.get("dst") for item in result["trans_result"]]
+        if len(translations) == len(segments):
+            return translations
+        # 条数不一致时按原文对齐
+        by_source = {item.get("src", "").strip(): item.get("dst") for item in result["trans_result"]}
+        return [by_source.get(segment.strip()) for segment in segments]
+
+    def translate_many(self, texts: Sequence[str], target_lang: str, max_workers: int = 1) -> List[str]:
+        # 百度按行拆分 q，多行文本先拆成单行片段，翻译后再按原来的换行拼回
+        lines = [(text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n") for text in texts]
+        positions = [(i, j) for i, item in enumerate(lines) for j, line in enumerate(item) if line.strip()]
+        translated, failures = self.translate_segments([lines[i][j].strip() for i, j in positions], target_lang,
+                                                       max_workers)
+
+        failed: Dict[int, str] = {}
+        for k, ((i, j), result) in enumerate(zip(positions, translated)):
+            if result is None:
+                failed.setdefault(i, failures[k])
+            else:
+                lines[i][j] = result
+        return [f"{self.service}错误{failed[i]}" if i in failed else "\n".join(item) for i, item in enumerate(lines)]
+
+
+class YoudaoBatchTranslator(SegmentBatchTranslator):
+    """有道智云批量翻译接口：一次请求携带多个 q 参数"""
+
+    service = "有道翻译"
+    url = "https://openapi.youdao.com/v2/api"
+    # 批量请求的文本总长度上限（字符）与条数上限
+    max_chars = 5000
+    max_items = 50
+    # 411 访问频率受限、412 长请求过于频繁
+    retryable_codes = ("411", "412")
+
+    def max_request_size(self) -> int:
+        return self.max_chars
+
+    def max_request_items(self) -> Optional[int]:
+        return self.max_items
+
+    @staticmethod
+    def truncate(q: str) -> str:
+        """有道签名使用的截断：超过20个字符时取前10个字符 + 长度 + 后10个字符"""
+        size = len(q)
+        return q if size <= 20 else q[0:10] + str(size) + q[size - 10:size]
+
+    def _request(self, segments: List[str], target_lang: str) -> List[Optional[str]]:
+        salt = str(int(time.time() * 1000))
+        curtime = str(int(time.time()))
+        # 批量接口的签名输入为所有 q 拼接后的字符串
+        sign_str = self.app_id + self.truncate("".join(segments)) + salt + curtime + self.secret_key
+        sign = hashlib.sha256(sign_str.encode("utf-8")).hexdigest()
+        data = {
+            "q": list(segments),
+            "from": "auto",
+            "to": target_lang,
+            "appKey": self.app_id,
+            "salt": salt,
+            "sign": sign,
+            "signType": "v3",
+            "curtime": curtime,
+        }
+        result = self._post(data=data)
+
+        error_code = str(result.get("errorCode", "未知"))
+        if error_code != "0":
+            if error_code in self.retryable_codes:
+                raise RetryableError(f"代码: {error_code}", retry_after=1.0)
+            raise Exception(f"代码: {error_code}")
+        # errorIndex 中的条目翻译失败，其余结果按 query 对齐
+        by_query = {item.get("query"): item.get("translation") for item in result.get("translateResults") or []}
+        return [by_query.get(segment) for segment in segments]
+
+
+class TencentBatchTranslator(SegmentBatchTranslator):
+    """腾讯云机器翻译 TextTranslateBatch：SourceTextList 一次携带多段文本，请求使用 TC3-HMAC-SHA256 签名"""
+
+    service = "腾讯翻译"
+    url = "https://tmt.tencentcloudapi.com"
+    region = "ap-guangzhou"
+    version = "2018-03-21"
+    action = "TextTranslateBatch"
+    # 签名范围中的服务名
+    sign_service = "tmt"
+    # 默认接口频率上限为每秒5次
+    default_qps = 5.0
+    # 单次请求所有文本的总长度需低于6000字符
+    max_chars = 5999
+    retryable_codes = ("RequestLimitExceeded", "InternalError", "LimitExceeded.LimitedAccessFrequency")
+
+    def max_request_size(self) -> int:
+        return self.max_chars
+
+    @staticmethod
+    def _hmac(key: bytes, message: str) -> bytes:
+        return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+    def sign_headers(self, payload: str, timestamp: int) -> Dict[str, str]:
+        """按 TC3-HMAC-SHA256 规范计算签名，返回请求头"""
+        host = urlsplit(self.url).netloc
+        service = self.sign_service
+        date = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+        content_type = "application/json; charset=utf-8"
+        signed_headers = "content-type;host"
+        canonical_request = "\n".join([
+            "POST", "/", "",
+            f"content-type:{content_type}", f"host:{host}", "",
+            signed_headers, hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+        ])
+        scope = f"{date}/{service}/tc3_request"
+        string_to_sign = "\n".join([
+            "TC3-HMAC-SHA256", str(timestamp), scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        secret_date = self._hmac(("TC3" + self.secret_key).encode("utf-8"), date)
+        secret_signing = self._hmac(self._hmac(secret_date, service), "tc3_request")
+        signature = hmac.new(secret_signing, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        return {
+            "Authorization": f"TC3-HMAC-SHA256 Credential={self.app_id}/{scope}, "
+                             f"SignedHeaders={signed_headers}, Signature={signature}",
+            "Content-Type": content_type,
+            "Host": host,
+            "X-TC-Action": self.action,
+            "X-TC-Timestamp": str(timestamp),
+            "X-TC-Version": self.version,
+            "X-TC-Region": self.region,
+        }
+
+    def _request(self, segments: List[str], target_lang: str) -> List[Optional[str]]:
+        payload = json.dumps({"Source": "auto", "Target": target_lang, "ProjectId": 0,
+                              "SourceTextList": list(segments)}, ensure_ascii=False)
+        headers = self.sign_headers(payload, int(time.time()))
+        result = self._post(data=payload.encode("utf-8"), headers=headers).get("Response", {})
+
+        if "Error" in result:
+            error_code = result["Error"].get("Code", "未知")
+            message = f" [{error_code}]: {result['Error'].get('Message', '未知错误')}"
+            if error_code in self.retryable_codes:
+                raise RetryableError(message, retry_after=1.0)
+            raise Exception(message)
+        translations = result.get("TargetTextList") or []
+        if len(translations) != len(segments):
+            raise Exception(f": 返回 {len(translations)} 条译文，预期 {len(segments)} 条")
+        return translations
+
+
+def get_batch_translator(service: str, app_id: str, secret_key: str,
+                         qps: Optional[float] = None) -> SegmentBatchTranslator:
+    translators: Dict[str, Callable[..., SegmentBatchTranslator]] = {
+        BaiduBatchTranslator.service: BaiduBatchTranslator,
+        YoudaoBatchTranslator.service: YoudaoBatchTranslator,
+        TencentBatchTranslator.service: TencentBatchTranslator,
+    }
+    return translators[service](app_id, secret_key, qps)
@@ -1,8 +1,10 @@
 import traceback
 from typing import Tuple
 
+from .connector_registry import get_connector_registry
 from .llm_client import LLMClient
 from .llm_connectors import SiliconFlowConnector
+from .retry_policy import DEFAULT_DEADLINE, DEFAULT_MAX_RETRIES, RetryPolicy
 
 
 class SiliconFlowServiceConnectorNode:
@@ -31,6 +33,11 @@ class SiliconFlowServiceConnectorNode:
                         "placeholder": "Enter custom model ID (used when model_select is 'Custom')",
                     },
                 ),
+                "max_retries": ("INT", {"default": DEFAULT_MAX_RETRIES, "min": 0, "max": 10}),
+                "retry_deadline": ("FLOAT", {"default": DEFAULT_DEADLINE, "min": 1.0, "max": 600.0, "step": 1.0}),
+                # 客户端限流：-1 使用服务商默认配额（或环境变量 OWLV_RATE_LIMIT_<服务商>），0 不限制
+                "rpm_limit": ("INT", {"default": -1, "min": -1, "max": 1000000}),
+                "tpm_limit": ("INT", {"default": -1, "min": -1, "max": 1000000000}),
             },
         }
 
@@ -39,22 +46,31 @@ class SiliconFlowServiceConnectorNode:
     FUNCTION = "execute"
     CATEGORY = "Text Processing/LLM"
 
-    def execute(self, api_key: str, model_select: str, custom_model_id: str = "") -> Tuple[object]:
+    def execute(self, api_key: str, model_select: str, custom_model_id: str = "",
+                max_retries: int = DEFAULT_MAX_RETRIES, retry_deadline: float = DEFAULT_DEADLINE,
+                rpm_limit: int = -1, tpm_limit: int = -1) -> Tuple[object]:
         try:
             # 确定最终使用的模型
             model = custom_model_id if model_select == "Custom" and custom_model_id.strip() else model_select
             
-            # 创建 SiliconFlow Connector
-            connector = SiliconFlowConnector(api_key, model)
-            
-            # 封装到 LLMClient
-            config = {
-                "provider": "SiliconFlow",
-                "model": model,
-                "api_key": api_key,
-                "connector": connector,
-            }
-            client = LLMClient(kind="service", config=config)
+            def build_client():
+                # 创建 SiliconFlow Connector
+                connector = SiliconFlowConnector(api_key, model)
+                connector.retry_policy = RetryPolicy(max_retries=max_retries, deadline=retry_deadline)
+                connector.rate_limits = (rpm_limit, tpm_limit)
+                
+                # 封装到 LLMClient
+                config = {
+                    "provider": "SiliconFlow",
+                    "model": model,
+                    "api_key": api_key,
+                    "connector": connector,
+                }
+                return LLMClient(kind="service", config=config)
+
+            # 输入不变时复用已登记的客户端，保留其连接与运行状态
+            client = get_connector_registry().get_or_create("SiliconFlow", model, api_key, build_client,
+                                                            options=(max_retries, retry_deadline, rpm_limit, tpm_limit))
             return (client,)
             
         except Exception as e:
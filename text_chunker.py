@@ -0,0 +1,104 @@
+import re
+from typing import List, NamedTuple, Sequence
+
+from .token_utils import estimate_tokens
+
+
+# 句末标点：中日韩句号/问号/感叹号等可直接断句；拉丁句号需后接空白，避免切开 3.14 之类的小数
+_SENTENCE_PATTERN = re.compile(
+    "[^\n]*?(?:[。！？；…]+[」』”’）)]*|[.!?;]+[\"')\\]]*(?=\\s)|(?=\n)|$)\\s*",
+    re.S,
+)
+_LINE_PATTERN = re.compile(r"[^\n]*\n+|[^\n]+$")
+_EDGE_PATTERN = re.compile(r"(\s*)(.*?)(\s*)$", re.S)
+
+
+class TextChunk(NamedTuple):
+    """一段待翻译的文本；prefix/suffix 为原文首尾空白，拼接时原样保留"""
+    prefix: str
+    body: str
+    suffix: str
+    context: str = ""
+
+
+def _split_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_PATTERN.findall(text) if s]
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    # 找不到断句位置时按字符切分；按一字一token计算，保证不超出预算
+    return [text[i:i + max_tokens] for i in range(0, len(text), max_tokens)]
+
+
+def _units(text: str, max_tokens: int) -> List[str]:
+    """把文本切成不超过预算的最小单元（段落/行 → 句子 → 字符），单元顺序拼接等于原文"""
+    units = []
+    for line in _LINE_PATTERN.findall(text):
+        if estimate_tokens(line) <= max_tokens:
+            units.append(line)
+            continue
+        for sentence in _split_sentences(line):
+            if estimate_tokens(sentence) <= max_tokens:
+                units.append(sentence)
+            else:
+                units.extend(_hard_split(sentence, max_tokens))
+    return units
+
+
+def _tail(text: str, max_tokens: int) -> str:
+    """取文本末尾不超过 max_tokens 的完整句子，作为下一段的上下文"""
+    if max_tokens <= 0:
+        return ""
+    tail = ""
+    for sentence in reversed(_split_sentences(text)):
+        if estimate_tokens(sentence + tail) > max_tokens:
+            break
+        tail = sentence + tail
+    return (tail or text[-max_tokens:]).strip()
+
+
+def split_text(text: str, max_tokens: int, context_tokens: int = 0) -> List[TextChunk]:
+    """按段落与句子边界把文本贪心地装入不超过 max_tokens 的分段。
+
+    context_tokens > 0 时，每段附带上一段原文末尾的句子作为上下文（滑动窗口），
+    上下文取自原文而非译文，因此各段仍可并发翻译。
+    """
+    max_tokens = max(1, int(max_tokens))
+    if estimate_tokens(text) <= max_tokens:
+        pieces = [text]
+    else:
+        pieces, current, current_tokens = [], "", 0
+        for unit in _units(text, max_tokens):
+            unit_tokens = estimate_tokens(unit)
+            if current and current_tokens + unit_tokens > max_tokens:
+                pieces.append(current)
+                current, current_tokens = "", 0
+            current += unit
+            current_tokens += unit_tokens
+        if current:
+            pieces.append(current)
+
+    chunks = []
+    previous = ""
+    for piece in pieces:
+        prefix, body, suffix = _EDGE_PATTERN.match(piece).groups()
+        if not body:
+            # 纯空白段并入上一段的结尾
+            if chunks:
+                last = chunks[-1]
+                chunks[-1] = last._replace(suffix=last.suffix + piece)
+            else:
+                chunks.append(TextChunk(piece, "", ""))
+            continue
+        context = _tail(previous, context_tokens) if previous else ""
+        chunks.append(TextChunk(prefix, body, suffix, context))
+        previous = body
+    return chunks
+
+
+def join_chunks(chunks: Sequence[TextChunk], translations: Sequence[str]) -> str:
+    """按原顺序拼接各段译文，并还原段间的换行与空白"""
+    return "".join(
+        chunk.prefix + ((translation or "").strip() if chunk.body else "") + chunk.suffix
+        for chunk, translation in zip(chunks, translations)
+    )
@@ -0,0 +1,29 @@
+import re
+from typing import Dict, Iterable
+
+
+# 中日韩文字（含假名、谚文与全角标点）大致一字一token
+_CJK_PATTERN = re.compile("[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+# 拉丁文字约4个字符一个token
+LATIN_CHARS_PER_TOKEN = 4
+# 每条消息的固定开销（角色标记等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_cjk(text: str) -> int:
+    """统计中日韩文字（含全角标点）的字符数"""
+    return len(_CJK_PATTERN.findall(text)) if text else 0
+
+
+def estimate_tokens(text: str) -> int:
+    """快速估算文本的token数（无需加载分词器）"""
+    if not text:
+        return 0
+    cjk = count_cjk(text)
+    other = len(text) - cjk
+    return cjk + (other + LATIN_CHARS_PER_TOKEN - 1) // LATIN_CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    """估算一组 chat messages 的输入token数"""
+    return sum(estimate_tokens(str(m.get("content", ""))) + MESSAGE_OVERHEAD_TOKENS for m in messages)
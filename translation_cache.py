@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .metrics import get_metrics
+
+
+# 这些前缀表示节点返回的是错误/提示信息而不是译文，永远不能写入缓存
+ERROR_PREFIXES = (
+    "翻译失败",
+    "LLM 翻译失败",
+    "LLM API调用失败",
+    "百度翻译错误",
+    "百度翻译需要",
+    "有道翻译错误",
+    "有道翻译需要",
+    "腾讯翻译错误",
+    "腾讯翻译需要",
+    "腾讯翻译功能需要",
+    "不支持的翻译服务",
+    "[LLM ",
+    "[Ollama ",
+    "[Local ",
+)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "translation_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+DEFAULT_MEMORY_ENTRIES = 2048
+DEFAULT_MEMORY_TTL = 3600
+# 每写入多少条执行一次淘汰检查
+EVICT_INTERVAL = 200
+
+
+def is_error_text(text: Any) -> bool:
+    """判断结果是否为错误/占位字符串"""
+    if not isinstance(text, str):
+        return True
+    return text.startswith(ERROR_PREFIXES)
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：统一Unicode形式与换行符，去掉首尾空白"""
+    text = unicodedata.normalize("NFC", text or "")
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def make_cache_key(engine: str, model: str, target_language: str, system_prompt: str, text: str) -> str:
+    """由 (引擎/服务商, 模型, 目标语言, 系统提示词, 归一化文本哈希) 生成缓存键"""
+    text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    raw = json.dumps([engine or "", model or "", target_language or "", system_prompt or "", text_hash], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def fingerprint_secret(secret: str) -> str:
+    """返回密钥的短哈希，用于区分不同密钥而不泄露原文"""
+    if not secret:
+        return ""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+class MemoryLRUCache:
+    """进程内有界 LRU + TTL 缓存，位于持久化缓存之前"""
+
+    def __init__(self, max_entries: int = DEFAULT_MEMORY_ENTRIES, ttl: float = DEFAULT_MEMORY_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires = item
+            if self.ttl and expires < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str) -> bool:
+        if is_error_text(value) or not value.strip():
+            return False
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._data)}
+
+
+class TranslationCache:
+    """基于 SQLite (WAL模式) 的持久化翻译缓存。
+
+    按条目数与存活时间淘汰，统计命中/未命中次数。
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_age: float = DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_accessed ON translations(accessed)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT value, created FROM translations WHERE key = ?", (key,)).fetchone()
+                if row is None or (self.max_age and now - row[1] > self.max_age):
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE translations SET accessed = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+                return row[0]
+            except sqlite3.Error as e:
+                print("TranslationCache get error:", e)
+                self.misses += 1
+                return None
+
+    def put(self, key: str, value: str) -> bool:
+        """写入缓存；错误字符串会被拒绝"""
+        if is_error_text(value) or not value.strip():
+            return False
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO translations (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                conn.commit()
+                self._writes += 1
+                if self._writes % EVICT_INTERVAL == 0:
+                    self._evict(conn, now)
+                return True
+            except sqlite3.Error as e:
+                print("TranslationCache put error:", e)
+                return False
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.max_age:
+            conn.execute("DELETE FROM translations WHERE created < ?", (now - self.max_age,))
+        if self.max_entries:
+            count = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM translations WHERE key IN "
+                    "(SELECT key FROM translations ORDER BY accessed ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+        conn.commit()
+
+    def evict(self):
+        """立即执行一次淘汰"""
+        with self._lock:
+            try:
+                self._evict(self._connect(), time.time())
+            except sqlite3.Error as e:
+                print("TranslationCache evict error:", e)
+
+    def clear(self):
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM translations")
+                conn.commit()
+            except sqlite3.Error as e:
+                print("TranslationCache clear error:", e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            try:
+                entries = self._connect().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            except sqlite3.Error:
+                entries = -1
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[TranslationCache] = None
+_cache_lock = threading.Lock()
+_memory_cache = MemoryLRUCache()
+
+
+def cache_enabled() -> bool:
+    """设置环境变量 OWLV_TRANSLATOR_CACHE=0 可全局关闭缓存"""
+    return os.environ.get("OWLV_TRANSLATOR_CACHE", "1").lower() not in ("0", "false", "off", "no")
+
+
+def get_translation_cache() -> TranslationCache:
+    """返回进程内共享的缓存实例（可用 OWLV_TRANSLATOR_CACHE_PATH 指定数据库路径）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache(os.environ.get("OWLV_TRANSLATOR_CACHE_PATH") or DEFAULT_CACHE_PATH)
+        return _cache
+
+
+def get_memory_cache() -> MemoryLRUCache:
+    return _memory_cache
+
+
+def cache_lookup(key: str, engine: str = "") -> Optional[str]:
+    """依次查询内存LRU与持久化缓存，命中情况按 engine 计入指标"""
+    cached = _memory_cache.get(key)
+    if cached is not None:
+        get_metrics().inc("cache_lookups_total", {"engine": engine, "result": "memory"})
+        return cached
+    cached = get_translation_cache().get(key)
+    if cached is not None:
+        _memory_cache.put(key, cached)
+    get_metrics().inc("cache_lookups_total", {"engine": engine, "result": "miss" if cached is None else "disk"})
+    return cached
+
+
+def cache_store(key: str, value: str) -> bool:
+    """写回两级缓存，错误字符串会被拒绝；持久化缓存写入失败（如数据库被锁或只读）时内存缓存照常写入"""
+    if not _memory_cache.put(key, value):
+        return False
+    get_translation_cache().put(key, value)
+    return True
+
+
+def cached_translate(engine: str, model: str, target_language: str, system_prompt: str, text: str,
+                     translate_fn, use_cache: bool = True) -> str:
+    """先查询缓存，未命中时调用 translate_fn() 并写回缓存"""
+    if not use_cache or not cache_enabled():
+        return translate_fn()
+    key = make_cache_key(engine, model, target_language, system_prompt, text)
+    cached = cache_lookup(key, engine)
+    if cached is not None:
+        return cached
+    result = translate_fn()
+    cache_store(key, result)
+    return result